@@ -0,0 +1,154 @@
+# -*- coding: utf-8 -*-
+"""
+Membership of many words in the language of a grammar. The grammar is
+prepared only once for the algorithm chosen, and the words are checked in
+a pool of processes, each of which receives the prepared grammar once.
+"""
+
+import os
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+
+from earley import recognizeWord, recognizeWordsSharingPrefixes
+
+
+""" It checks a word with a grammar already in Greibach normal form. The 
+empty word is checked apart, since the grammar may not generate it """
+
+def greibachBelongs(greibach_grammar, empty_word_belongs, word):
+    if len(word) == 0:
+        return empty_word_belongs
+
+    return greibach_grammar.checkBelongingRecursiveGreibach(word, greibach_grammar.start_symbol)
+
+
+""" It checks a word with a grammar in Chomsky normal form compiled for the
+CYK algorithm, and the empty word apart, since the grammar does not 
+generate it """
+
+def cykBelongs(compiled_cyk_grammar, empty_word_belongs, word):
+    if len(word) == 0:
+        return empty_word_belongs
+
+    return compiled_cyk_grammar.belongs(word)
+
+
+""" It returns a function that checks whether a word belongs to the
+language of the grammar with the algorithm given by engine:
+"earley": Earley algorithm (leo indicates whether Leo's optimization is used)
+"cyk": CYK algorithm with NumPy with the grammar in Chomsky normal form
+(chomskyForm), so the grammar is not modified.
+"greibach": search with the grammar in Greibach normal form 
+(membershipGreibachGrammar), so the grammar is not modified.
+The function can be sent to other processes. """
+
+def compileMembership(grammar, engine = "earley", leo = False):
+    if engine == "earley":
+        return partial(recognizeWord, grammar.compiledEarleyGrammar(), leo = leo)
+
+    elif engine == "cyk":
+        empty_word_belongs = grammar.start_symbol in grammar.nullableVariables()
+
+        return partial(cykBelongs, grammar.chomskyForm().compiledCYKGrammar(), empty_word_belongs)
+
+    elif engine == "greibach":
+        empty_word_belongs = grammar.start_symbol in grammar.nullableVariables()
+
+        return partial(greibachBelongs, grammar.membershipGreibachGrammar(), empty_word_belongs)
+
+    raise ValueError("Unknown membership engine: " + str(engine))
+
+
+""" It checks the words of a list one by one """
+
+def checkEachWord(membership, words):
+    return [membership(word) for word in words]
+
+
+""" Functions run by the processes of the pool. Each process receives the
+function that checks a list of words when it starts, and then the lists 
+of words """
+
+worker_check_words = None
+
+def initializeWorker(check_words):
+    global worker_check_words
+    worker_check_words = check_words
+
+def checkWordsWorker(words):
+    return worker_check_words(words)
+
+
+""" It splits the words in lists of chunk_size words, reading them only
+when they are needed """
+
+def splitWords(words, chunk_size):
+    chunk = []
+
+    for word in words:
+        chunk.append(word)
+
+        if len(chunk) == chunk_size:
+            yield chunk
+            chunk = []
+
+    if len(chunk) > 0:
+        yield chunk
+
+
+""" Generator of the results (True or False) for the words, in the same order
+as the words. check_words is the function that checks a list of words. 
+With workers = 1 the words are checked in this process. Otherwise, there 
+are at most 2 lists of words per process pending, so the words can be given
+by a generator that is read while the results are obtained, without keeping
+all of them in memory. """
+
+def checkWords(check_words, words, workers = None, chunk_size = 256):
+    if workers is None:
+        workers = os.cpu_count() or 1
+
+    if workers == 1:
+        for chunk in splitWords(words, chunk_size):
+            yield from check_words(chunk)
+
+        return
+
+    executor = ProcessPoolExecutor(max_workers = workers, initializer = initializeWorker, initargs = (check_words,))
+
+    try:
+        pending_results = deque()
+
+        for chunk in splitWords(words, chunk_size):
+            pending_results.append(executor.submit(checkWordsWorker, chunk))
+
+            if len(pending_results) >= 2 * workers:
+                yield from pending_results.popleft().result()
+
+        while len(pending_results) > 0:
+            yield from pending_results.popleft().result()
+
+    finally:
+        executor.shutdown(wait = True, cancel_futures = True)
+
+
+""" It checks the words with the Earley algorithm sharing the sets of the
+common prefixes: the words are sorted, so the words with a common prefix are
+consecutive, and each process checks consecutive sorted words with the 
+same recognizer (see recognizeWordsSharingPrefixes). The cost depends on the
+size of the prefix tree of the words instead of the total length of the 
+words. All the words are read before checking them. It returns the list of 
+results in the same order as the words. """
+
+def checkWordsSharingPrefixes(compiled_grammar, words, leo = False, workers = None, chunk_size = 256):
+    words = list(words)
+    sorted_positions = sorted(range(len(words)), key = words.__getitem__)
+    check_words = partial(recognizeWordsSharingPrefixes, compiled_grammar, leo = leo)
+
+    results = [False] * len(words)
+    sorted_words = (words[position] for position in sorted_positions)
+
+    for position, belongs in zip(sorted_positions, checkWords(check_words, sorted_words, workers, chunk_size)):
+        results[position] = belongs
+
+    return results
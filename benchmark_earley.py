@@ -0,0 +1,44 @@
+# -*- coding: utf-8 -*-
+"""
+Comparison of the Earley algorithm with and without the optimization of
+Joop Leo on the clausure of a grammar, whose production <S_v> -> S<S_v> is
+right recursive. For each length, it prints the time and the number of
+registers created in both cases.
+"""
+
+import os
+import time
+
+from grammar import GenerativeGrammar
+from earley import CompiledEarleyGrammar, EarleyRecognizer
+
+path = os.path.join(os.path.dirname(os.path.abspath(__file__)), "grammar_unitary_productions.txt")
+clausure_grammar = GenerativeGrammar.readGrammar(path).clausureGrammar()
+compiled_grammar = CompiledEarleyGrammar(clausure_grammar)
+
+""" Recognize the word with the recognizer and return the time, the number
+of registers created and whether the word belongs """
+
+def recognize(word, leo):
+    start_time = time.perf_counter()
+    recognizer = EarleyRecognizer(compiled_grammar, leo = leo)
+
+    for symbol in word:
+        recognizer.feed(symbol)
+
+    belongs = recognizer.accepts()
+    elapsed_time = time.perf_counter() - start_time
+    num_registers = sum(len(earley_set.items) for earley_set in recognizer.sets)
+
+    return elapsed_time, num_registers, belongs
+
+print("length   registers   time (s)   registers Leo   time Leo (s)")
+
+for length_word in [250, 500, 1000, 2000]:
+    word = "cd" * length_word # S -> A -> cd, so the word is S^n
+    elapsed_time, num_registers, belongs = recognize(word, False)
+    elapsed_time_leo, num_registers_leo, belongs_leo = recognize(word, True)
+
+    assert belongs and belongs_leo
+
+    print(f"{length_word:6d}   {num_registers:9d}   {elapsed_time:8.3f}   {num_registers_leo:13d}   {elapsed_time_leo:12.3f}")
@@ -0,0 +1,260 @@
+# -*- coding: utf-8 -*-
+"""
+Benchmarks of the main algorithms of the class GenerativeGrammar on families
+of grammars generated with a size parameter and on the grammars of the
+grammar_*.txt files. For each grammar, algorithm and size, it measures the
+time (the minimum of several runs) and the peak of memory allocated (with
+tracemalloc), and writes the results in JSON. If a baseline (results written
+before) is given, it fails when a result is worse than the baseline by more
+than the threshold.
+
+Usage: python benchmark_suite.py [--quick] [--output results.json]
+                                 [--baseline baseline.json] [--threshold 0.25]
+"""
+
+import argparse
+import glob
+import json
+import os
+import platform
+import sys
+import time
+import tracemalloc
+
+from grammar import GenerativeGrammar
+from grammar_cache import CACHE_DIRECTORY_VARIABLE
+from production_rule import ProductionRule
+
+
+""" Families of grammars. Each function returns the grammar and a function
+that returns a word of the language of the length given """
+
+def ambiguousGrammar():
+    # S -> SS | a: the words a^n have Catalan(n-1) derivation trees
+    grammar = GenerativeGrammar(["S"], ["a"], "S", [ProductionRule("S", ["S", "S"]), ProductionRule("S", ["a"])])
+
+    return grammar, lambda length: "a" * length
+
+def rightRecursiveGrammar():
+    # S -> aS | b
+    grammar = GenerativeGrammar(["S"], ["a", "b"], "S", [ProductionRule("S", ["a", "S"]), ProductionRule("S", ["b"])])
+
+    return grammar, lambda length: "a" * (length - 1) + "b"
+
+def leftRecursiveGrammar():
+    # S -> Sa | b
+    grammar = GenerativeGrammar(["S"], ["a", "b"], "S", [ProductionRule("S", ["S", "a"]), ProductionRule("S", ["b"])])
+
+    return grammar, lambda length: "b" + "a" * (length - 1)
+
+def wideAlphabetGrammar(num_terminals = 52):
+    # S -> xSx | x for each terminal symbol x: the palindromes of odd length
+    terminals = [chr(ord("a") + i) for i in range(26)] + [chr(ord("A") + i) for i in range(26)]
+    terminals = terminals[:num_terminals]
+    production_rules = []
+
+    for terminal in terminals:
+        production_rules.append(ProductionRule("S", [terminal, "S", terminal]))
+        production_rules.append(ProductionRule("S", [terminal]))
+
+    def palindrome(length):
+        half = "".join(terminals[i % len(terminals)] for i in range(length // 2))
+
+        return half + terminals[0] * (length % 2) + half[::-1]
+
+    return GenerativeGrammar(["S"], terminals, "S", production_rules), palindrome
+
+def nullableGrammar(num_variables = 4):
+    # S -> A1...Ak S | a, Ai -> b | \epsilon
+    variables = ["S"] + ["<A" + str(i) + ">" for i in range(1, num_variables + 1)]
+    production_rules = [ProductionRule("S", variables[1:] + ["S"]), ProductionRule("S", ["a"])]
+
+    for variable in variables[1:]:
+        production_rules.append(ProductionRule(variable, ["b"]))
+        production_rules.append(ProductionRule(variable, []))
+
+    return GenerativeGrammar(variables, ["a", "b"], "S", production_rules), lambda length: "b" * (length - 1) + "a"
+
+GRAMMAR_FAMILIES = {
+    "ambiguous": ambiguousGrammar,
+    "right recursive": rightRecursiveGrammar,
+    "left recursive": leftRecursiveGrammar,
+    "wide alphabet": wideAlphabetGrammar,
+    "nullable": nullableGrammar,
+}
+
+
+""" Algorithms measured. The membership algorithms receive the grammar already
+prepared (the preparation is measured with the transformations) and the
+word, and the transformations receive a copy of the grammar, since they
+modify it or keep what they compute in it. The Greibach algorithm receives
+a copy of the grammar in Chomsky normal form, since it cannot be applied to
+the null and unitary productions """
+
+def cykBelongs(chomsky_grammar, word):
+    return chomsky_grammar.checkBelongingCYK(word)
+
+def earleyBelongs(grammar, word):
+    return grammar.checkBelongingEarly(word)
+
+def earleyLeoBelongs(grammar, word):
+    return grammar.checkBelongingEarly(word, leo = True)
+
+def greibachBelongs(grammar, word):
+    return grammar.wordBelongsGreibach(word)
+
+MEMBERSHIP_ALGORITHMS = {
+    "checkBelongingCYK": (cykBelongs, lambda grammar: grammar.chomskyForm()),
+    "checkBelongingEarly": (earleyBelongs, lambda grammar: grammar),
+    "checkBelongingEarly leo": (earleyLeoBelongs, lambda grammar: grammar),
+    "wordBelongsGreibach": (greibachBelongs, lambda grammar: grammar),
+}
+
+GRAMMAR_ALGORITHMS = {
+    "transformChomsky": (lambda grammar: grammar.transformChomsky(), lambda grammar: grammar.copy()),
+    "transformGreibach": (lambda grammar: grammar.transformGreibach(), lambda grammar: grammar.chomskyForm()),
+    "infinityLanguaje": (lambda grammar: grammar.infinityLanguaje(), lambda grammar: grammar.copy()),
+}
+
+FAMILY_SIZES = [25, 50, 100]
+QUICK_FAMILY_SIZES = [10, 20]
+NULLABLE_SIZES = [2, 4, 8] # number of nullable variables of the transformations
+QUICK_NULLABLE_SIZES = [2, 4]
+
+
+""" It runs function(*prepare()) repeat times and returns the minimum time
+in seconds, and the peak of memory allocated in bytes in another run
+measured with tracemalloc, which makes it slower. prepare is not measured. """
+
+def measure(function, prepare, repeat):
+    elapsed_times = []
+
+    for i in range(repeat):
+        arguments = prepare()
+        start_time = time.perf_counter()
+        function(*arguments)
+        elapsed_times.append(time.perf_counter() - start_time)
+
+    arguments = prepare()
+    tracemalloc.start()
+
+    try:
+        function(*arguments)
+        peak_bytes = tracemalloc.get_traced_memory()[1]
+
+    finally:
+        tracemalloc.stop()
+
+    return min(elapsed_times), peak_bytes
+
+def result(benchmark, algorithm, size, elapsed_time, peak_bytes):
+    return {"benchmark": benchmark, "algorithm": algorithm, "size": size,
+            "seconds": elapsed_time, "peak_bytes": peak_bytes}
+
+
+""" It returns the list of results of all the benchmarks """
+
+def runBenchmarks(quick = False, repeat = 3, verbose = True):
+    family_sizes = QUICK_FAMILY_SIZES if quick else FAMILY_SIZES
+    nullable_sizes = QUICK_NULLABLE_SIZES if quick else NULLABLE_SIZES
+    results = []
+
+    def record(benchmark, algorithm, size, function, prepare):
+        elapsed_time, peak_bytes = measure(function, prepare, repeat)
+        results.append(result(benchmark, algorithm, size, elapsed_time, peak_bytes))
+
+        if verbose:
+            print(f"{benchmark:32s} {algorithm:24s} {size:6d} {elapsed_time:10.4f} s {peak_bytes:12d} B")
+
+    # Membership of words of increasing length
+    for family, create_grammar in GRAMMAR_FAMILIES.items():
+        grammar, word_of_length = create_grammar()
+
+        for algorithm, (belongs, prepare_grammar) in MEMBERSHIP_ALGORITHMS.items():
+            prepared_grammar = prepare_grammar(grammar)
+            belongs(prepared_grammar, word_of_length(family_sizes[0])) # Compile the grammar before measuring
+
+            for size in family_sizes:
+                word = word_of_length(size)
+                record(family, algorithm, size, belongs, lambda: (prepared_grammar, word))
+
+    # Transformations of grammars of increasing size
+    for size in nullable_sizes:
+        grammar = nullableGrammar(size)[0]
+
+        for algorithm, (transform, prepare_grammar) in GRAMMAR_ALGORITHMS.items():
+            record("nullable", algorithm, size, transform, lambda: (prepare_grammar(grammar),))
+
+    # Transformations of the grammars of the files
+    for path in sorted(glob.glob(os.path.join(os.path.dirname(os.path.abspath(__file__)), "grammar_*.txt"))):
+        grammar = GenerativeGrammar.readGrammar(path)
+        benchmark = os.path.basename(path)
+
+        for algorithm, (transform, prepare_grammar) in GRAMMAR_ALGORITHMS.items():
+            record(benchmark, algorithm, len(grammar.production_rules), transform, lambda: (prepare_grammar(grammar),))
+
+    return results
+
+
+""" It compares the results with the ones of the baseline and returns the
+list of descriptions of the regressions: the time or the peak of memory is
+greater than the one of the baseline by more than threshold (as a fraction).
+The times below min_seconds are not compared, since they are mostly noise. """
+
+def findRegressions(results, baseline_results, threshold, min_seconds = 0.001):
+    baseline = {(entry["benchmark"], entry["algorithm"], entry["size"]): entry for entry in baseline_results}
+    regressions = []
+
+    for entry in results:
+        baseline_entry = baseline.get((entry["benchmark"], entry["algorithm"], entry["size"]))
+
+        if baseline_entry is None:
+            continue
+
+        name = f"{entry['benchmark']} / {entry['algorithm']} / {entry['size']}"
+
+        if max(entry["seconds"], baseline_entry["seconds"]) >= min_seconds and entry["seconds"] > baseline_entry["seconds"] * (1 + threshold):
+            regressions.append(f"{name}: {entry['seconds']:.4f} s (baseline {baseline_entry['seconds']:.4f} s)")
+
+        if entry["peak_bytes"] > baseline_entry["peak_bytes"] * (1 + threshold):
+            regressions.append(f"{name}: {entry['peak_bytes']} B (baseline {baseline_entry['peak_bytes']} B)")
+
+    return regressions
+
+
+def main(arguments = None):
+    parser = argparse.ArgumentParser(description = "Benchmarks of the algorithms of GenerativeGrammar")
+    parser.add_argument("--quick", action = "store_true", help = "only the smallest sizes")
+    parser.add_argument("--repeat", type = int, default = 3, help = "runs of each benchmark (the minimum time is kept)")
+    parser.add_argument("--output", help = "file where the results are written in JSON")
+    parser.add_argument("--baseline", help = "results in JSON to compare with")
+    parser.add_argument("--threshold", type = float, default = 0.25, help = "fraction of the baseline allowed above it")
+    options = parser.parse_args(arguments)
+
+    # The normal forms must be computed, not read from the cache on disk
+    os.environ.pop(CACHE_DIRECTORY_VARIABLE, None)
+
+    results = runBenchmarks(options.quick, options.repeat)
+    report = {"python": platform.python_version(), "quick": options.quick, "results": results}
+
+    if options.output:
+        with open(options.output, "w") as file:
+            json.dump(report, file, indent = 2)
+
+    if options.baseline:
+        with open(options.baseline) as file:
+            baseline_results = json.load(file)["results"]
+
+        regressions = findRegressions(results, baseline_results, options.threshold)
+
+        for regression in regressions:
+            print("Regression: " + regression)
+
+        if len(regressions) > 0:
+            return 1
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
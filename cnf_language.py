@@ -0,0 +1,431 @@
+# -*- coding: utf-8 -*-
+"""
+Words of the language of a grammar in Chomsky normal form, by length. The
+lengths of the words and the numbers of derivations of each variable are
+computed from the shorter lengths, and the words of a length are obtained 
+symbol by symbol, without keeping the words obtained before.
+"""
+
+import bisect
+import operator
+
+
+""" Grammar in Chomsky normal form (productions A->a and A->BC) prepared to
+obtain its words by length. The words are tuples of terminal symbols, and 
+the words of the same length are compared symbol by symbol, which is the
+lexicographic order of the words. The tables of the lengths of the words 
+and of the numbers of derivations of each variable are extended length by
+length, only up to the greatest length used, and kept for the next calls. The grammar must not have useless
+symbols (see maximumLength). """
+
+class CNFLanguage:
+    start_symbol: str
+    terminal_rules: dict # variable A -> terminal symbols a with A->a, sorted
+    binary_rules: dict # variable A -> pairs (B,C) with A->BC
+    variables: set
+
+    def __init__(self, cnf_grammar, cache_limit = 4096):
+        self.start_symbol = cnf_grammar.start_symbol
+        self.terminal_rules = {}
+        self.binary_rules = {}
+        self.cache_limit = cache_limit
+
+        for production_rule in cnf_grammar.production_rules:
+            right_part = production_rule.right_part
+
+            if len(right_part) == 1:
+                self.terminal_rules.setdefault(production_rule.left_part, set()).add(right_part[0])
+
+            elif len(right_part) == 2:
+                self.binary_rules.setdefault(production_rule.left_part, {})[right_part] = None
+
+            else:
+                raise ValueError("The grammar is not in Chomsky normal form: " + repr(production_rule))
+
+        # The repeated productions are considered once
+        self.terminal_rules = {variable: sorted(symbols) for variable, symbols in self.terminal_rules.items()}
+        self.binary_rules = {variable: list(rules) for variable, rules in self.binary_rules.items()}
+        self.rules_by_first_variable = {} # B -> pairs (A, C) with A->BC
+        self.rules_by_second_variable = {} # C -> pairs (A, B) with A->BC
+        variables = set(self.terminal_rules) | set(self.binary_rules) | {self.start_symbol}
+
+        for variable, rules in self.binary_rules.items():
+            for first_variable, second_variable in rules:
+                variables.add(first_variable)
+                variables.add(second_variable)
+                self.rules_by_first_variable.setdefault(first_variable, []).append((variable, second_variable))
+                self.rules_by_second_variable.setdefault(second_variable, []).append((variable, first_variable))
+
+        self.variables = variables
+
+        """ Number of derivations of the words of each length: the position n of
+        the list of A is the number of derivation trees from A of the words of 
+        length n """
+
+        self.derivation_counts = {variable: [0, len(self.terminal_rules.get(variable, ()))] for variable in variables}
+
+        """ Lengths of the words generated by each variable up to max_length: 
+        the bit n of the integer of A tells whether A generates some word of 
+        length n, and the bit max_length-n of the reversed integer too """
+
+        self.max_length = 1
+        self.length_bits = {variable: 2 if variable in self.terminal_rules else 0 for variable in variables}
+        self.reversed_length_bits = {variable: 1 if variable in self.terminal_rules else 0 for variable in variables}
+        self.split_tables = {} # (variable, length) -> (cumulative counts, splits (B, k, C))
+        self.word_derivation_counts = {} # (variable, word) -> derivation trees, for at most cache_limit words
+
+    """ It computes the number of derivations of each variable for each length
+    up to the length given, with integers without limit:
+    D(A, n) = sum over A->BC and 0<k<n of D(B, k) * D(C, n-k). 
+    For each production, the products are computed at once over all k """
+
+    def extendDerivationCounts(self, length):
+        while len(self.derivation_counts[self.start_symbol]) <= length:
+            n = len(self.derivation_counts[self.start_symbol])
+            new_counts = {}
+
+            for variable in self.derivation_counts:
+                count = 0
+
+                for first_variable, second_variable in self.binary_rules.get(variable, ()):
+                    first_counts = self.derivation_counts[first_variable]
+                    second_counts = self.derivation_counts[second_variable]
+                    count = count + sum(map(operator.mul, first_counts[1:n], reversed(second_counts[1:n])))
+
+                new_counts[variable] = count
+
+            # The counts of length n only depend on shorter lengths
+            for variable, count in new_counts.items():
+                self.derivation_counts[variable].append(count)
+
+    """ It computes the lengths of the words generated by each variable up to
+    the length given, in the same way as the numbers of derivations but only
+    checking whether they are 0: A generates some word of length n if there 
+    are a production A->BC and 0<k<n such that B generates some word of 
+    length k and C some word of length n-k. With the lengths of C in reverse
+    order, all the k are checked at once with the bits of the integers """
+
+    def extendLengthBits(self, length):
+        while self.max_length < length:
+            n = self.max_length + 1
+            new_lengths = []
+
+            for variable in self.variables:
+                generates = 0
+
+                for first_variable, second_variable in self.binary_rules.get(variable, ()):
+                    if (self.length_bits[first_variable] >> 1) & self.reversed_length_bits[second_variable]:
+                        generates = 1
+                        break
+
+                new_lengths.append((variable, generates))
+
+            # The lengths of length n only depend on shorter lengths
+            for variable, generates in new_lengths:
+                self.length_bits[variable] |= generates << n
+                self.reversed_length_bits[variable] = (self.reversed_length_bits[variable] << 1) | generates
+
+            self.max_length = n
+
+    def countDerivations(self, variable, length):
+        self.extendDerivationCounts(length)
+
+        return self.derivation_counts[variable][length]
+
+    """ It returns the table used to choose how a word of the length given is
+    derived from the variable: the splits (B, k, C) for each production A->BC
+    and 0<k<n, and the cumulative numbers of derivations of the splits, so
+    a split is chosen with probability D(B, k) * D(C, n-k) / D(A, n). The
+    tables are kept, so they are computed only once for each variable and
+    length """
+
+    def splitTable(self, variable, length):
+        table = self.split_tables.get((variable, length))
+
+        if table is None:
+            self.extendDerivationCounts(length)
+            cumulative_counts = []
+            splits = []
+            total = 0
+
+            for first_variable, second_variable in self.binary_rules.get(variable, ()):
+                first_counts = self.derivation_counts[first_variable]
+                second_counts = self.derivation_counts[second_variable]
+
+                for k in range(1, length):
+                    count = first_counts[k] * second_counts[length - k]
+
+                    if count > 0:
+                        total = total + count
+                        cumulative_counts.append(total)
+                        splits.append((first_variable, k, second_variable))
+
+            table = (cumulative_counts, splits)
+            self.split_tables[(variable, length)] = table
+
+        return table
+
+    """ It returns a word (tuple of terminal symbols) of the length given 
+    generated by the variable, whose derivation tree is chosen uniformly among
+    all the derivation trees of the words of that length, with the generator
+    of random numbers given. The variable must generate some word of that
+    length. The tree is built from left to right with a stack of the pairs 
+    (variable, length) still to derive, so there is no recursion. """
+
+    def sampleWord(self, variable, length, random_generator):
+        word = []
+        pending = [(variable, length)]
+
+        while len(pending) > 0:
+            variable, length = pending.pop()
+
+            if length == 1:
+                word.append(random_generator.choice(self.terminal_rules[variable]))
+
+            else:
+                cumulative_counts, splits = self.splitTable(variable, length)
+                position = bisect.bisect_right(cumulative_counts, random_generator.randrange(cumulative_counts[-1]))
+                first_variable, k, second_variable = splits[position]
+                pending.append((second_variable, length - k))
+                pending.append((first_variable, k))
+
+        return tuple(word)
+
+    """ It returns the number of derivation trees of the word from the variable,
+    with the CYK algorithm counting the derivations of each variable for each
+    subword instead of only checking them. The numbers of at most cache_limit 
+    words are kept """
+
+    def countWordDerivations(self, variable, word):
+        count = self.word_derivation_counts.get((variable, word))
+
+        if count is None:
+            count = self.computeWordDerivations(variable, word)
+
+            if len(self.word_derivation_counts) < self.cache_limit:
+                self.word_derivation_counts[(variable, word)] = count
+
+        return count
+
+    def computeWordDerivations(self, variable, word):
+        n = len(word)
+
+        if n == 0:
+            return 0
+
+        # counts[i][l] : variable -> derivations of the subword of length l starting at i
+        counts = [[None, {}] for i in range(n)]
+
+        for i, symbol in enumerate(word):
+            for left_part, symbols in self.terminal_rules.items():
+                if symbol in symbols:
+                    counts[i][1][left_part] = 1
+
+        for length in range(2, n + 1):
+            for i in range(n - length + 1):
+                subword_counts = {}
+
+                for left_part, rules in self.binary_rules.items():
+                    count = 0
+
+                    for first_variable, second_variable in rules:
+                        for k in range(1, length):
+                            first_count = counts[i][k].get(first_variable)
+
+                            if first_count:
+                                count = count + first_count * counts[i + k][length - k].get(second_variable, 0)
+
+                    if count > 0:
+                        subword_counts[left_part] = count
+
+                counts[i].append(subword_counts)
+
+        return counts[0][n].get(variable, 0)
+
+    """ Generator of the words of the length given generated by the start 
+    symbol, in lexicographic order and without repetitions. The words are
+    built symbol by symbol, and for each prefix the sets of the positions 
+    keep the parts of the derivation trees of the words with that prefix 
+    (see predictNodes and nextPosition), so the symbols that can follow the
+    prefix are known and there are no prefixes without words. Only the sets
+    of the positions of the current prefix are kept, whose size is at most
+    proportional to the square of the length, and the words are not kept. """
+
+    def generateWords(self, length):
+        if length < 1:
+            return
+
+        self.extendLengthBits(length)
+
+        if not self.length_bits[self.start_symbol] >> length & 1:
+            return
+
+        # Lengths of the words generated by each variable, up to the length given
+        word_lengths = {variable: [k for k in range(1, length + 1) if bits >> k & 1] for variable, bits in self.length_bits.items()}
+        position_sets = [self.predictNodes(0, [(self.start_symbol, length)], word_lengths) + ({},)]
+        pending_symbols = [self.nextSymbols(position_sets[0])] # symbols still to try after each prefix, the last one first
+        word = []
+
+        while len(pending_symbols) > 0:
+            symbols = pending_symbols[-1]
+
+            if len(symbols) == 0:
+                pending_symbols.pop()
+                position_sets.pop()
+
+                if len(word) > 0:
+                    word.pop()
+
+                continue
+
+            symbol = symbols.pop()
+            word.append(symbol)
+
+            if len(word) == length:
+                yield tuple(word)
+                word.pop()
+
+            else:
+                position_sets.append(self.nextPosition(position_sets, symbol, word_lengths))
+                pending_symbols.append(self.nextSymbols(position_sets[-1]))
+
+    """ The set of a position p describes the nodes (A, p, l) of the derivation
+    trees of the words with the prefix, which are variables A that must 
+    generate the symbols p..p+l-1, and the nodes (A, i, p-i) generated by the
+    prefix that end at p. It is a tuple with a dictionary A -> lengths l of
+    the nodes (A, p, l), the set of the variables A of the nodes (A, p, 1),
+    which generate the symbol p, and a dictionary A -> starts i of the nodes
+    (A, i, p-i) generated.
+    It predicts the nodes (A, l) given, and the nodes of the productions A->BC
+    of each new node (A, p, l), that is, the node (B, p, k) for each length k
+    such that B generates some word of length k and C some word of length 
+    l-k. So every node predicted can be generated with the words of the 
+    lengths required. It returns the first two elements of the set """
+
+    def predictNodes(self, position, predictions, word_lengths):
+        node_lengths = {}
+        leaf_variables = set()
+
+        while len(predictions) > 0:
+            variable, length = predictions.pop()
+            lengths = node_lengths.setdefault(variable, set())
+
+            if length in lengths:
+                continue
+
+            lengths.add(length)
+
+            if length == 1:
+                leaf_variables.add(variable)
+                continue
+
+            for first_variable, second_variable in self.binary_rules.get(variable, ()):
+                second_bits = self.length_bits[second_variable]
+
+                for k in word_lengths[first_variable]:
+                    if k >= length:
+                        break
+
+                    if second_bits >> (length - k) & 1:
+                        predictions.append((first_variable, k))
+
+        return node_lengths, leaf_variables
+
+    """ The symbols that can follow the prefix whose last set is given, in
+    reverse lexicographic order """
+
+    def nextSymbols(self, position_set):
+        symbols = set()
+
+        for variable in position_set[1]:
+            symbols.update(self.terminal_rules.get(variable, ()))
+
+        return sorted(symbols, reverse = True)
+
+    """ It returns the set of the next position p when the prefix of the sets
+    given is followed by the symbol. The nodes (A, p-1, 1) of the last set 
+    with A->symbol are generated, and then the nodes predicted (A, i, l) with
+    A->BC whose node of C (C, j, p-j) is generated after the node of B 
+    (B, i, j-i). For each node of B generated (B, i, p-i), the nodes of C that
+    complete the nodes (A, i, l) predicted with A->BC are predicted at p """
+
+    def nextPosition(self, position_sets, symbol, word_lengths):
+        position = len(position_sets)
+        generated_nodes = []
+
+        for variable in position_sets[position - 1][1]:
+            if symbol in self.terminal_rules.get(variable, ()):
+                generated_nodes.append((variable, position - 1, 1))
+
+        generated = set(generated_nodes)
+        predictions = []
+
+        while len(generated_nodes) > 0:
+            variable, start, length = generated_nodes.pop()
+            start_node_lengths, start_leaf_variables, start_generated = position_sets[start]
+
+            # Productions A->BC with B the variable of the node
+            for parent_variable, second_variable in self.rules_by_first_variable.get(variable, ()):
+                second_bits = self.length_bits[second_variable]
+
+                for parent_length in start_node_lengths.get(parent_variable, ()):
+                    if parent_length > length and second_bits >> (parent_length - length) & 1:
+                        predictions.append((second_variable, parent_length - length))
+
+            # Productions A->BC with C the variable of the node
+            for parent_variable, first_variable in self.rules_by_second_variable.get(variable, ()):
+                for parent_start in start_generated.get(first_variable, ()):
+                    parent = (parent_variable, parent_start, position - parent_start)
+
+                    if parent not in generated and parent[2] in position_sets[parent_start][0].get(parent_variable, ()):
+                        generated.add(parent)
+                        generated_nodes.append(parent)
+
+        ended_nodes = {}
+
+        for variable, start, length in generated:
+            ended_nodes.setdefault(variable, []).append(start)
+
+        return self.predictNodes(position, predictions, word_lengths) + (ended_nodes,)
+
+    """ The greatest length of the words generated by the start symbol, or
+    None if the language is infinite. Since the grammar has no useless
+    symbols, each variable generates some word and is reached from the start
+    symbol, and the productions A->BC make the words longer, so the language
+    is infinite if, and only if, some variable derives a word where it 
+    appears again, that is, the graph of the productions A -> B, A -> C has a
+    cycle. The variables are ordered so that the variables of the right parts
+    of the productions of a variable are before it (topological order), which
+    is not possible if there is a cycle, and the maximum lengths are computed
+    in that order """
+
+    def maximumLength(self):
+        variables = self.variables
+        pending_variables = {variable: len(self.binary_rules.get(variable, ())) * 2 for variable in variables}
+        variables_using = {variable: [] for variable in variables} # B -> variables A with A->BC or A->CB, once per appearance
+
+        for variable, rules in self.binary_rules.items():
+            for first_variable, second_variable in rules:
+                variables_using[first_variable].append(variable)
+                variables_using[second_variable].append(variable)
+
+        maximum_lengths = {}
+        ordered_variables = [variable for variable in variables if pending_variables[variable] == 0]
+
+        for variable in ordered_variables:
+            maximum_lengths[variable] = 1 if variable in self.terminal_rules else 0
+
+            for first_variable, second_variable in self.binary_rules.get(variable, ()):
+                length = maximum_lengths[first_variable] + maximum_lengths[second_variable]
+                maximum_lengths[variable] = max(maximum_lengths[variable], length)
+
+            for next_variable in variables_using[variable]:
+                pending_variables[next_variable] = pending_variables[next_variable] - 1
+
+                if pending_variables[next_variable] == 0:
+                    ordered_variables.append(next_variable)
+
+        if len(ordered_variables) < len(variables):
+            return None # There is a cycle
+
+        return maximum_lengths[self.start_symbol]
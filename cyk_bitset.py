@@ -0,0 +1,145 @@
+# -*- coding: utf-8 -*-
+"""
+CYK algorithm with NumPy. Each cell V_ij of the table is a boolean vector
+over the variables of the grammar (bit k set if the k-th variable generates
+the subchain), and the productions A->BC are evaluated for all start
+positions and all split points of a given length at once.
+"""
+
+import numpy as np
+from numpy.lib.stride_tricks import as_strided
+
+from tracing import tracer, trace
+
+
+""" Compiled form of a grammar in Chomsky normal form for the CYK algorithm.
+The variables are numbered, the productions A->a are stored as a boolean
+vector per terminal symbol and the productions A->BC as three arrays of
+variable numbers, sorted by A. It does not keep a reference to the grammar,
+so it can be reused while the grammar does not change and sent to other
+processes. """
+
+class CompiledCYKGrammar:
+    variable_index: dict # number of each variable
+    terminal_vectors: dict # terminal symbol a -> boolean vector of the variables A with A->a
+    binary_left: np.ndarray # A in the productions A->BC
+    binary_first: np.ndarray # B in the productions A->BC
+    binary_second: np.ndarray # C in the productions A->BC
+    start_index: int # number of the start symbol
+
+    def __init__(self, grammar):
+        variable_index = {}
+
+        """ Number the variables, including the ones that only appear
+        in the left part of a production """
+
+        for variable in grammar.variable_symbols:
+            variable_index.setdefault(variable, len(variable_index))
+
+        for production_rule in grammar.production_rules:
+            variable_index.setdefault(production_rule.left_part, len(variable_index))
+
+        num_variables = len(variable_index)
+        terminal_vectors = {}
+        binary_rules = set()
+
+        """ Productions that are not of the form A->a or A->BC are ignored,
+        as in the CYK algorithm over lists """
+
+        for production_rule in grammar.production_rules:
+            right_part = production_rule.right_part
+            left_index = variable_index[production_rule.left_part]
+
+            if len(right_part) == 1 and right_part[0] not in variable_index:
+                if right_part[0] not in terminal_vectors:
+                    terminal_vectors[right_part[0]] = np.zeros(num_variables, dtype = bool)
+
+                terminal_vectors[right_part[0]][left_index] = True
+
+            elif len(right_part) == 2 and right_part[0] in variable_index and right_part[1] in variable_index:
+                binary_rules.add((left_index, variable_index[right_part[0]], variable_index[right_part[1]]))
+
+        binary_rules = sorted(binary_rules)
+        binary_array = np.array(binary_rules, dtype = np.intp).reshape(len(binary_rules), 3)
+
+        self.variable_index = variable_index
+        self.terminal_vectors = terminal_vectors
+        self.binary_left = binary_array[:, 0].copy()
+        self.binary_first = binary_array[:, 1].copy()
+        self.binary_second = binary_array[:, 2].copy()
+        self.start_index = variable_index.get(grammar.start_symbol)
+
+    """ It checks whether the word belongs to the language of the grammar.
+    table[A, j, i] is True if the variable A generates the subchain that
+    starts in the position i and has length j. With this layout, the cells 
+    V_ik for all i and k, and the cells V_i+k,j-k for all i and k, are views
+    of the table, so they are not copied for each length j. """
+
+    def belongs(self, word, verbose = False):
+        length_word = len(word)
+        num_variables = len(self.variable_index)
+
+        if length_word == 0 or self.start_index is None:
+            return False
+
+        table = np.zeros((num_variables, length_word + 1, length_word), dtype = bool)
+        variable_stride, length_stride, start_stride = table.strides
+
+        """ V_i1 = {A | A->a is a production and the i-th symbol of u is a} """
+
+        for i in range(length_word):
+            terminal_vector = self.terminal_vectors.get(word[i])
+
+            if terminal_vector is None: # No variable generates the symbol
+                return False
+
+            table[:, 1, i] = terminal_vector
+
+        """ For each length j, take at once, for all start positions i and all
+        split points k, the cells V_ik and V_i+k,j-k. A->BC is added to V_ij
+        if B is in V_ik and C in V_i+k,j-k for some k """
+
+        for j in range(2, length_word + 1):
+            num_starts = length_word - j + 1
+
+            if verbose or tracer.enabled:
+                trace(verbose, "cyk length", "Determining V_ij for the subchains of length " + str(j), length = j, cells = num_starts)
+
+                if tracer.enabled:
+                    tracer.count("cyk cell", num_starts)
+
+            # first_cells[A, k-1, i] = A in V_ik
+            first_cells = table[:, 1:j, :num_starts]
+
+            # second_cells[A, k-1, i] = A in V_i+k,j-k: when k grows, the length 
+            # decreases and the start position increases by one
+            second_cells = as_strided(table[:, j - 1, 1:], shape = (num_variables, j - 1, num_starts), 
+                                      strides = (variable_stride, start_stride - length_stride, start_stride), 
+                                      writeable = False)
+
+            # Only the productions whose variables appear in some of the cells can be applied
+            first_found = first_cells.any(axis = (1, 2))
+            second_found = second_cells.any(axis = (1, 2))
+            active = first_found[self.binary_first] & second_found[self.binary_second]
+
+            if not active.any():
+                continue
+
+            left_active = self.binary_left[active]
+            applied = (first_cells[self.binary_first[active]] & second_cells[self.binary_second[active]]).any(axis = 1)
+
+            """ The productions are sorted by the left part, so the productions
+            with the same left part are contiguous: join them with or """
+
+            left_variables, first_positions = np.unique(left_active, return_index = True)
+            table[left_variables, j, :num_starts] = np.logical_or.reduceat(applied, first_positions, axis = 0)
+
+        """ The word can be generated if, and only if, the start symbol
+        belongs to V_1n"""
+
+        belongs = bool(table[self.start_index, length_word, 0])
+
+        if verbose or tracer.enabled:
+            trace(verbose, "cyk result", "The start symbol is in V_1" + str(length_word) + ": " + str(belongs), belongs = belongs)
+
+        return belongs
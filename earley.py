@@ -0,0 +1,312 @@
+# -*- coding: utf-8 -*-
+"""
+Earley algorithm over dotted items. An item (rule, dot, origin) corresponds
+to the register (origin, j, A, alpha, beta) of the set REGISTERS[j], where
+A -> alpha beta is the production number rule and alpha has dot symbols.
+"""
+
+from tracing import tracer, trace
+
+
+""" Compiled form of a grammar for the Earley algorithm. The productions
+are numbered, and the numbers of the productions of each variable and the
+nullable variables are computed only once. It does not keep a reference to
+the grammar, so it can be reused while the grammar does not change. """
+
+class CompiledEarleyGrammar:
+    start_symbol: str
+    start_rule: int # number of the production S' -> S added to recognize the words
+    left_parts: list # left part of each production
+    right_parts: list # right part (tuple) of each production
+    rules_by_left_part: dict # variable -> numbers of its productions
+    variables: frozenset # variables, including the ones without productions
+    nullable_variables: frozenset # variables that generate the empty word
+
+    def __init__(self, grammar):
+        self.start_symbol = grammar.start_symbol
+        self.left_parts = []
+        self.right_parts = []
+        self.rules_by_left_part = {}
+
+        for production_rule in grammar.production_rules:
+            self.rules_by_left_part.setdefault(production_rule.left_part, []).append(len(self.left_parts))
+            self.left_parts.append(production_rule.left_part)
+            self.right_parts.append(tuple(production_rule.right_part))
+
+        self.variables = frozenset(grammar.variable_symbols) | frozenset(self.left_parts)
+        self.nullable_variables = grammar.nullableVariables()
+        
+        """ Add the production S' -> S, which is not a production of any
+        variable (its left part is None), so the word is generated if, and
+        only if, the register (0,n,S',S,\epsilon) is in REGISTERS[n] """
+        
+        self.start_rule = len(self.left_parts)
+        self.left_parts.append(None)
+        self.right_parts.append((self.start_symbol,))
+
+
+""" Set REGISTERS[j] of the Earley algorithm. The items are kept in a list
+(in the order they are added, which is the order they are processed) and
+in a set to discard repeated items. The items whose next symbol is a
+variable are indexed by that variable (to complete them) and the items
+whose next symbol is terminal by that symbol (to advance them). """
+
+class EarleySet:
+    __slots__ = ("items", "item_set", "waiting", "scanning", "transitive")
+
+    def __init__(self):
+        self.items = []
+        self.item_set = set()
+        self.waiting = {} # variable B -> items (rule, dot, origin) with B after the dot
+        self.scanning = {} # terminal a -> items with a after the dot
+        self.transitive = {} # variable B -> topmost item of B (Leo), or None if there is not
+
+
+""" Earley recognizer. The sets REGISTERS[0..j] are built one by one as
+the symbols of the word are given with feed, so the recognizer can be
+used for a whole word or symbol by symbol. After each symbol, accepts 
+and isViablePrefix tell in constant time whether the symbols given form a
+word of the language and whether some continuation of them can be. 
+
+With leo = True, it applies the optimization of Joop Leo for right 
+recursive grammars: when a variable A is completed from REGISTERS[i] and
+there is only one register in REGISTERS[i] waiting for A, of the form 
+(k,i,B,\beta,A), then B is also completed, and so on. Instead of adding all 
+the registers of this chain, only the topmost one is added, and it is 
+stored in REGISTERS[i] to be reused. Then the words of grammars such as 
+S -> aS|\epsilon are recognized in linear time. """
+
+class EarleyRecognizer:
+
+    def __init__(self, compiled_grammar, verbose = False, leo = False):
+        self.grammar = compiled_grammar
+        self.verbose = verbose
+        self.tracing = verbose or tracer.enabled # whether the registers added are reported
+        self.leo = leo
+        self.sets = []
+
+        """ Initialization: REGISTERS[0] = {(0,0,S',\epsilon,S)}, and the clausure
+        adds (0,0,S,\epsilon,\betha) for each production S -> \betha """
+
+        first_set = EarleySet()
+        self.sets.append(first_set)
+
+        if self.tracing:
+            trace(verbose, "earley set", "Determining REGISTERS [0] ", position = 0)
+
+        self.addItem(first_set, (self.grammar.start_rule, 0, 0), 0)
+        self.closeSet(0)
+
+    """ It returns the register (i,j,A,\alpha,\betha) that corresponds to an item of REGISTERS[j] """
+
+    def register(self, item, position):
+        rule, dot, origin = item
+        right_part = self.grammar.right_parts[rule]
+        left_part = self.grammar.left_parts[rule]
+
+        if rule == self.grammar.start_rule:
+            left_part = self.grammar.start_symbol + "'"
+
+        return (origin, position, left_part, "".join(right_part[:dot]), right_part[dot:])
+
+    def addItem(self, earley_set, item, position):
+        if item not in earley_set.item_set:
+            earley_set.item_set.add(item)
+            earley_set.items.append(item)
+
+            if self.tracing:
+                register = self.register(item, position)
+                trace(self.verbose, "earley item", "Adding \n" + str(register), register = register)
+
+    """ It processes the items of REGISTERS[position] in order, including
+    the ones added meanwhile:
+    Clausure: for (i,j,A,\alpha,B\gamma), add (j,j,B,\epsilon,\delta) for each B -> \delta.
+    If B is nullable, also add (i,j,A,\alpha B,\gamma), so the completions of
+    null derivations inside this set are not lost.
+    Termination: for (i,j,A,\alpha,\epsilon), for each (h,i,B,\gamma,A\delta)
+    in REGISTERS[i], add (h,j,B,\gammaA,\delta). """
+
+    def closeSet(self, position):
+        grammar = self.grammar
+        earley_set = self.sets[position]
+        k = 0
+
+        while k < len(earley_set.items):
+            item = earley_set.items[k]
+            rule, dot, origin = item
+            right_part = grammar.right_parts[rule]
+            k = k+1
+
+            if dot == len(right_part): # Termination
+                left_part = grammar.left_parts[rule]
+
+                # The sets before this one do not change anymore, so their topmost items can be computed
+                if self.leo and origin < position:
+                    topmost_item = self.topmostItem(origin, left_part)
+
+                    if topmost_item is not None:
+                        self.addItem(earley_set, topmost_item, position)
+                        continue
+
+                for waiting_rule, waiting_dot, waiting_origin in self.sets[origin].waiting.get(left_part, ()):
+                    self.addItem(earley_set, (waiting_rule, waiting_dot + 1, waiting_origin), position)
+
+            else:
+                symbol = right_part[dot]
+
+                if symbol in grammar.variables: # Clausure
+                    earley_set.waiting.setdefault(symbol, []).append(item)
+
+                    for predicted_rule in grammar.rules_by_left_part.get(symbol, ()):
+                        self.addItem(earley_set, (predicted_rule, 0, position), position)
+
+                    if symbol in grammar.nullable_variables:
+                        self.addItem(earley_set, (rule, dot + 1, origin), position)
+
+                else:
+                    earley_set.scanning.setdefault(symbol, []).append(item)
+
+    """ It returns the topmost item of the variable in REGISTERS[position] (the 
+    completed item at the end of the chain of registers that are completed one
+    after the other when the variable is completed), or None if there is
+    not only one register waiting for the variable whose last symbol is that
+    variable. It is computed only once per set and variable: the chain is
+    followed until a set where it is already known, and then the topmost 
+    item is stored in all the sets of the chain. """
+
+    def topmostItem(self, position, variable):
+        grammar = self.grammar
+        chain = [] # (transitive items of the set, variable, register completed when the variable is)
+        topmost_item = None
+
+        while True:
+            transitive = self.sets[position].transitive
+
+            if variable in transitive:
+                topmost_item = transitive[variable]
+                break
+
+            transitive[variable] = None # In case the chain comes back to this variable
+            waiting_items = self.sets[position].waiting.get(variable, ())
+
+            if len(waiting_items) != 1 or waiting_items[0][1] + 1 != len(grammar.right_parts[waiting_items[0][0]]):
+                break
+
+            rule, dot, origin = waiting_items[0]
+            chain.append((transitive, variable, (rule, dot + 1, origin)))
+
+            if rule == grammar.start_rule: # Nothing waits for S'
+                break
+
+            position = origin
+            variable = grammar.left_parts[rule]
+
+        for transitive, variable, completed_item in reversed(chain):
+            if topmost_item is None:
+                topmost_item = completed_item
+
+            transitive[variable] = topmost_item
+
+        return topmost_item
+
+    """ Advance: for all register (i,j,A,\alpha,c\gamma) in REGISTERS[j], where
+    c is the new symbol, add (i,j+1,A,\alpha c,\gamma) to REGISTERS[j+1]. Then the
+    new set is closed. It returns False if the new set is empty, since then
+    no word that starts with the symbols given can be generated. """
+
+    def feed(self, symbol):
+        position = len(self.sets)
+        previous_set = self.sets[-1]
+        next_set = EarleySet()
+        self.sets.append(next_set)
+
+        if len(previous_set.items) == 0: # The symbols given are not a viable prefix anymore
+            return False
+
+        if self.tracing:
+            trace(self.verbose, "earley set", "Advance with the symbol " + str(symbol), position = position, symbol = symbol)
+
+        for rule, dot, origin in previous_set.scanning.get(symbol, ()):
+            self.addItem(next_set, (rule, dot + 1, origin), position)
+
+        if self.tracing:
+            trace(self.verbose, "earley closure", "Clausure and termination of REGISTERS [" + str(position) + "]", position = position)
+
+        self.closeSet(position)
+
+        return len(next_set.items) > 0
+
+    """ It goes back to the sets REGISTERS[0..length], as if only the first 
+    length symbols had been given. The sets kept do not change, so the next
+    symbols can be given with feed. """
+
+    def backtrack(self, length):
+        del self.sets[length + 1:]
+
+    """ The symbols given are a prefix of some word generated by the grammar
+    if, and only if, the last set REGISTERS[j] is not empty """
+
+    def isViablePrefix(self):
+        return len(self.sets[-1].items) > 0
+
+    """ The word given can be generated by the grammar if, and only if, in
+    the last set REGISTERS[n] there is the register (0,n,S',S, \epsilon) """
+
+    def accepts(self):
+        item = (self.grammar.start_rule, 1, 0)
+        accepted = item in self.sets[-1].item_set
+
+        if accepted and self.tracing:
+            register = self.register(item, len(self.sets) - 1)
+            trace(self.verbose, "earley accepted", "The word can be generated by the grammar because of the register \n" + str(register), register = register)
+
+        return accepted
+
+
+""" It checks whether a word can be generated by the compiled grammar. The
+compiled grammar can be reused for several words. """
+
+def recognizeWord(compiled_grammar, word, verbose = False, leo = False):
+    recognizer = EarleyRecognizer(compiled_grammar, verbose, leo)
+
+    for symbol in word:
+        # If REGISTERS[j] is empty, no continuation of the word can be generated
+        if not recognizer.feed(symbol):
+            return False
+
+    """The word can be generated by the grammar if, and only if, in REGISTERS[n], there is a register of the form (0,n,S',S, \epsilon)"""
+
+    return recognizer.accepts()
+
+
+""" It checks a list of words with the same recognizer. For each word, the 
+sets of the common prefix with the previous word are kept, and only the 
+sets of the rest of the word are built. If the words are sorted, this is 
+the depth-first walk of the prefix tree of the words, so each prefix shared
+by several words is processed only once. It returns the list of results. """
+
+def recognizeWordsSharingPrefixes(compiled_grammar, words, leo = False):
+    recognizer = EarleyRecognizer(compiled_grammar, leo = leo)
+    previous_word = ()
+    results = []
+
+    for word in words:
+        # Common prefix with the previous word, among the symbols that have sets
+        common_length = 0
+        max_common_length = min(len(word), len(previous_word), len(recognizer.sets) - 1)
+
+        while common_length < max_common_length and word[common_length] == previous_word[common_length]:
+            common_length = common_length + 1
+
+        recognizer.backtrack(common_length)
+        viable = recognizer.isViablePrefix()
+        j = common_length
+
+        while viable and j < len(word):
+            viable = recognizer.feed(word[j])
+            j = j+1
+
+        results.append(viable and recognizer.accepts())
+        previous_word = word
+
+    return results
@@ -3,9 +3,14 @@
 General class for Generative grammar
 """
 
+import os
+import re
+import sys
 from typing import AbstractSet
-from production_rule import ProductionRule
-import networkx as nx
+from functools import partial
+from production_rule import ProductionRule, ProductionRuleList, modification_numbers
+from earley import CompiledEarleyGrammar, EarleyRecognizer, recognizeWord
+from tracing import tracer, trace
 
 def get_powerset(some_set):
         """Returns all subsets of size 0 - len(some_list) for some_list"""
@@ -30,6 +35,109 @@ def get_powerset(some_set):
 variable_type = str  # type of the variables
 terminal_type =  str # type of the terminal symbols
 
+""" Patterns of the lines of the files of grammars: the sets of variables or
+terminal symbols, and the right parts of the productions """
+
+SET_LINE = re.compile(r"\s*([VT])\s*=\s*\{(.*)\}\s*")
+RIGHT_PART_SYMBOL = re.compile(r"[^<]|<[^<>]*>|<")
+
+WRITE_BUFFER_SIZE = 1 << 16 # size of the buffer of the files where the grammars are written
+
+""" Error in the text of a grammar, with the line and the column (from 1)
+where it has been found """
+
+class GrammarSyntaxError(ValueError):
+    
+    def __init__(self, message, line, column):
+        ValueError.__init__(self, "Line " + str(line) + ", column " + str(column) + ": " + message)
+        self.line = line
+        self.column = column
+
+""" List of symbols (variables or terminal symbols) that keeps a count of
+its elements, so that checking whether a symbol is in the list does not 
+go across the list. The order of the list is preserved, since the algorithms
+of Greibach go across the variables in order. Every method that changes the
+list takes a new number of modification (version). """
+
+class SymbolList(list):
+    
+    def __init__(self, symbols = ()):
+        list.__init__(self, symbols)
+        self.rebuildCounts()
+        
+    def rebuildCounts(self):
+        self.version = next(modification_numbers)
+        self.symbol_counts = {}
+        
+        for symbol in self:
+            self.symbol_counts[symbol] = self.symbol_counts.get(symbol, 0) + 1
+            
+    def countSymbol(self, symbol):
+        self.version = next(modification_numbers)
+        self.symbol_counts[symbol] = self.symbol_counts.get(symbol, 0) + 1
+        
+    def uncountSymbol(self, symbol):
+        self.version = next(modification_numbers)
+        
+        if self.symbol_counts[symbol] == 1:
+            del self.symbol_counts[symbol]
+            
+        else:
+            self.symbol_counts[symbol] = self.symbol_counts[symbol] - 1
+        
+    def __contains__(self, symbol):
+        return symbol in self.symbol_counts
+    
+    # The counts are computed again when the list is copied or pickled
+    
+    def __reduce__(self):
+        return (SymbolList, (list(self),))
+    
+    """ Methods of list that modify the list """
+    
+    def append(self, symbol):
+        list.append(self, symbol)
+        self.countSymbol(symbol)
+        
+    def extend(self, symbols):
+        for symbol in symbols:
+            self.append(symbol)
+            
+    def __iadd__(self, symbols):
+        self.extend(symbols)
+        return self
+    
+    def insert(self, position, symbol):
+        list.insert(self, position, symbol)
+        self.countSymbol(symbol)
+        
+    def remove(self, symbol):
+        list.remove(self, symbol)
+        self.uncountSymbol(symbol)
+        
+    def pop(self, position = -1):
+        symbol = list.pop(self, position)
+        self.uncountSymbol(symbol)
+        return symbol
+    
+    def clear(self):
+        list.clear(self)
+        self.rebuildCounts()
+        
+    """ It removes several symbols going across the list only once """
+        
+    def removeSymbols(self, symbols_to_remove):
+        list.__init__(self, [symbol for symbol in self if symbol not in symbols_to_remove])
+        self.rebuildCounts()
+        
+    def __setitem__(self, position, value):
+        list.__setitem__(self, position, value)
+        self.rebuildCounts()
+        
+    def __delitem__(self, position):
+        list.__delitem__(self, position)
+        self.rebuildCounts()
+
 class GenerativeGrammar: 
     variable_symbols: AbstractSet[variable_type] # variables or non-terminal symbols
     terminal_symbols: AbstractSet[terminal_type] # terminal symbols
@@ -40,8 +148,8 @@ class GenerativeGrammar:
     path is indicated in the argument file_name. """
     
     def __init__(self, variables, terminals, start, generative_rules) -> None:
-         object.__setattr__(self, "variable_symbols", variables)
-         object.__setattr__(self, "terminal_symbols", terminals)
+         object.__setattr__(self, "variable_symbols", SymbolList(variables))
+         object.__setattr__(self, "terminal_symbols", SymbolList(terminals))
          
          object.__setattr__(self, "start_symbol", start)
          
@@ -51,7 +159,11 @@ class GenerativeGrammar:
           #   self.validateProductionRule(rule)
              
         
-         object.__setattr__(self, "production_rules", generative_rules)
+         # The rules are indexed by their left part and by the first symbol of their right part
+         object.__setattr__(self, "production_rules", ProductionRuleList(generative_rules))
+         
+         # Objects computed from the grammar (see derivedForm)
+         object.__setattr__(self, "derived_forms", {})
 
         
     """ It validates the initial symbol by checking that  it 
@@ -66,9 +178,15 @@ class GenerativeGrammar:
       
            """
            
-    """ Static method that creates a grammar from a list of strings
-    The first string corresponds to the variables, the second one to the 
-    terminal symbols, and the third string contains the production rules """
+    """ Static method that creates a grammar from a list of strings, or from 
+    any iterable of lines, such as an open file, which is read line by line.
+    The lines of the form V = {...} and T = {...} contain the variables and 
+    the terminal symbols separated by commas, and the lines of the form 
+    A -> x|y contain the production rules of A. The start symbol is the first 
+    variable. In the right parts, the variables of several characters are 
+    written between <>, and every other character is a symbol. The blank
+    lines are skipped, and a GrammarSyntaxError with the line and the column
+    is raised for any other line. """
         
     @staticmethod
     def fromText(lines):
@@ -76,84 +194,66 @@ class GenerativeGrammar:
         terminals = []
         production_rules = []
         
-        """ Obtain the list of variables and terminal symbols from the 
-        lineas read, assuming that the first character of these lines is
-        {, the last one is }, and that, in the lines, the elements are
-        separated by commas """
+        number_line = 0
         
         for line in lines:
-            first_character = line[0]
+            number_line = number_line + 1
+            line = line.rstrip("\r\n")
             
-            """ For reading the variables or terminal symbols, skip until character '{' """
-        
-            if first_character == 'V' or first_character == 'T': 
-                key_found = False
-                i = 1
+            if line.strip() == "":
+                continue
+            
+            set_match = SET_LINE.fullmatch(line)
+            
+            if set_match is not None:
+                """ The elements are separated by commas """
+                
+                elements = [element.strip() for element in set_match.group(2).split(",")]
+                symbols_read = [sys.intern(element) for element in elements if element != ""]
                 
-                while not key_found:
-                    if line[i] == '{':
-                        key_found = True
+                if set_match.group(1) == "V":
+                    variables.extend(symbols_read)
                     
-                    i = i+1
-                        
-                if first_character == 'V': # Read the variables     
-                    line_variables = line[i:-2] # skip until the character { in the line, remove the last character '}'
-                    list_variables_read = line_variables.split(",")
-                    num_variables_read = len(list_variables_read)
+                else:
+                    terminals.extend(symbols_read)
+                    
+                continue
                 
-                    for i in range(num_variables_read):
-                        variables.append(list_variables_read[i])
-                        
-                      # The start symbol is the first variable read.     
-                    start_variable = variables[0]
-                        
-                else: # Read the terminal symbols
-                    line_terminal_symbols = line[i:-2] # skip until the character { in the line, remove the last character '}'
-                    list_terminals_read  = line_terminal_symbols.split(",")
-                    num_terminals_read = len(list_terminals_read)
+            arrow_position = line.find("->")
+            
+            if arrow_position < 0:
+                raise GrammarSyntaxError("Expected V = {...}, T = {...} or a production rule", number_line, 1)
                 
-                    for i in range(num_terminals_read):
-                        terminals.append(list_terminals_read[i])
-                    
-            elif first_character == '<' or first_character in variables: # Production line 
-                production_parts = line.split("->")
-                left_part = production_parts[0].strip() # The left part is before ->, removing blank spaces
-                 
-                """ We consider that in a line can be several rules with the same left part
-                The right parts are separated by the character '|'"""
+            left_part = line[:arrow_position].strip() # The left part is before ->, removing blank spaces
+            
+            if left_part == "":
+                raise GrammarSyntaxError("Missing left part of the production rule", number_line, 1)
                 
-                string_right = production_parts[1].strip() # The left part is after ->, removing blank spaces
-                string_right_parts = string_right.split("|")
-                    
-                for string_right_part in string_right_parts:
-                     right_part = []
-                     reading_variable = False
-                     string_variable = ''
-                      
-                     """ Read the right part of a rule. It must be considered that
-                     the variables are between <>. Hence, we must consider, in each moment,
-                      whether we are reading '<', '>', or a character between these symbols """
+            left_part = sys.intern(left_part)
             
-                     for j in range(len(string_right_part)):
-                        if reading_variable:
-                            string_variable = string_variable + string_right_part[j]
-                    
-                            if string_right_part[j] == '>':
-                                reading_variable = False
-                                right_part.append(string_variable)
+            """ We consider that in a line can be several rules with the same left part
+            The right parts are separated by the character '|'. The variables are the
+            chains between <>, and the rest of characters are symbols """
+            
+            start_right_part = arrow_position + 2
+            
+            for string_right_part in line[start_right_part:].split("|"):
+                # Each symbol is kept once, so equal symbols are the same string
+                right_part = tuple(map(sys.intern, RIGHT_PART_SYMBOL.findall(string_right_part.strip())))
                 
-                        elif string_right_part[j] == '<':  
-                            reading_variable = True
-                            string_variable = '<'
-                    
-                        else:
-                            right_part.append(string_right_part[j])
-                    
-              
-                     rule = ProductionRule(left_part, right_part)
-                     production_rules.append(rule)
+                if "<" in right_part: # Only a '<' that is not closed is read as a symbol
+                    for symbol_match in RIGHT_PART_SYMBOL.finditer(string_right_part):
+                        if symbol_match.group() == "<":
+                            raise GrammarSyntaxError("Variable without '>'", number_line, start_right_part + symbol_match.start() + 1)
+                
+                production_rules.append(ProductionRule(left_part, right_part))
+                start_right_part = start_right_part + len(string_right_part) + 1
         
+        if len(variables) == 0:
+            raise GrammarSyntaxError("The variables V = {...} have not been given", number_line, 1)
             
+        # The start symbol is the first variable read
+        start_variable = variables[0]
         generated_grammar = GenerativeGrammar(variables, terminals,  start_variable, production_rules)
         
         return generated_grammar
@@ -161,70 +261,183 @@ class GenerativeGrammar:
     """
     Static method that creates a grammar given the path of a file.
     It reads the lines of the file and creates the grammar from such
-    lines using the previous method.
+    lines using the previous method. If transformation is "chomsky" or 
+    "greibach", the grammar is transformed into that normal form, which is
+    read from the cache if it was stored (see applyTransformation).
     """
     @staticmethod
-    def readGrammar(path_file):
-        file = open(path_file)
-        lines = file.readlines()
-        generated_grammar = GenerativeGrammar.fromText(lines)
+    def readGrammar(path_file, transformation = None, cache = None):
+        with open(path_file) as file:
+            generated_grammar = GenerativeGrammar.fromText(file)
+        
+        if transformation == "chomsky":
+            generated_grammar.transformChomsky(cache = cache)
+            
+        elif transformation == "greibach":
+            generated_grammar.transformGreibach(cache = cache)
+            
+        elif transformation is not None:
+            raise ValueError("Unknown transformation: " + str(transformation))
                 
         return generated_grammar
     
-    """
-    It writes the grammar in a file given the name of the file
-    """
+    """ It replaces the symbols and the productions of the grammar """
     
-    def writeGrammar(self, path_file):
-        file = open(path_file, 'w')
-        num_variables = len(self.variable_symbols)
-        num_terminals = len(self.terminal_symbols)
+    def replaceContent(self, variables, terminals, start, production_rules):
+        object.__setattr__(self, "variable_symbols", SymbolList(variables))
+        object.__setattr__(self, "terminal_symbols", SymbolList(terminals))
+        object.__setattr__(self, "start_symbol", start)
+        object.__setattr__(self, "production_rules", ProductionRuleList(production_rules))
+        
+    """ It returns a new grammar with the same symbols and production rules.
+    The rules are immutable, so they are shared with this grammar, and only 
+    the lists are new. """
+    
+    def copy(self):
+        return GenerativeGrammar(self.variable_symbols, self.terminal_symbols, self.start_symbol, self.production_rules)
+    
+    """ The grammar is copied or sent to other processes without the objects
+    computed from it """
+    
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        del state["derived_forms"]
         
-        # Write the variables
-        string_variables = "V = {"
+        return state
+    
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        object.__setattr__(self, "derived_forms", {})
+    
+    """ It returns the numbers of modification of the lists of the grammar and
+    its start symbol, which change whenever the grammar changes """
+    
+    def contentVersion(self):
+        return (self.variable_symbols.version, self.terminal_symbols.version, self.production_rules.version, self.start_symbol)
+    
+    """ It returns the object with the name given computed from the grammar 
+    (for instance, its nullable variables or its Chomsky normal form). It is 
+    computed with compute the first time, and it is kept until the grammar 
+    changes, so it is only computed again when the grammar has been modified.
+    The object returned is shared, so it must not be modified. """
+    
+    def derivedForm(self, name, compute):
+        version = self.contentVersion()
+        derived_form = self.derived_forms.get(name)
         
-        for i in range(num_variables - 1):
-            string_variables = string_variables + self.variable_symbols[i] + ","
+        if derived_form is None or derived_form[0] != version:
+            derived_form = (version, compute())
+            self.derived_forms[name] = derived_form
             
-        string_variables = string_variables + self.variable_symbols[num_variables-1] + "}"
-        file.write(string_variables + "\n")  
+        return derived_form[1]
+    
+    """ Analyses kept until the grammar changes: the variables that can be 
+    replaced by terminal symbols, the nullable variables and the graph of the
+    variables (variable A -> variables B with a production A -> alphaBbeta) """
+    
+    def productiveVariables(self):
+        return self.derivedForm("productive variables", lambda: frozenset(self.determineVarablesReplacedbyTerminals()))
+    
+    def nullableVariables(self):
+        return self.derivedForm("nullable variables", lambda: frozenset(self.computeNullableVariables()))
+    
+    def dependencyGraph(self):
+        return self.derivedForm("dependency graph", self.computeDependencyGraph)
+    
+    """ Transformations that do not modify the grammar. Each one returns a new
+    grammar, which can be modified, and the transformed grammar is kept until
+    this grammar changes, so it is transformed only once. The cache is the 
+    cache on disk used by transformChomsky and transformGreibach. """
+    
+    def withoutUselessSymbols(self):
+        return self.normalForm("without useless symbols", lambda grammar: grammar.deleteUselessSymbolsProductions()).copy()
+    
+    def chomskyForm(self, binarize_null = False, cache = None):
+        name = "chomsky (binarized null productions)" if binarize_null else "chomsky"
         
-        # Write the terminal symbols
+        return self.normalForm(name, lambda grammar: grammar.transformChomsky(cache = cache, binarize_null = binarize_null)).copy()
+    
+    def greibachForm(self, cache = None):
+        return self.normalForm("greibach", lambda grammar: grammar.transformGreibach(cache = cache)).copy()
+    
+    """ It returns the grammar obtained applying transform to a copy of the 
+    grammar, kept until the grammar changes. It must not be modified """
+    
+    def normalForm(self, name, transform):
+        
+        def computeNormalForm():
+            transformed_grammar = self.copy()
+            transform(transformed_grammar)
+            
+            return transformed_grammar
         
-        string_terminals = "T = {"
+        return self.derivedForm(name, computeNormalForm)
+    
+    """ It transforms the grammar with the method transform. If a cache is 
+    given, or the environment variable GRAMMAR_CACHE_DIRECTORY contains the
+    directory of a cache, the grammar is replaced with its normal form when
+    the cache has it, and otherwise the normal form obtained is stored in 
+    the cache """
+    
+    def applyTransformation(self, transformation, transform, verbose = False, cache = None):
+        from grammar_cache import GrammarCache, grammarFingerprint # imported when a grammar is transformed, not with this module
         
-        for i in range( num_terminals - 1):
-            string_terminals = string_terminals + self.terminal_symbols[i] + ","
+        if cache is None:
+            cache = GrammarCache.fromEnvironment()
             
-        string_terminals = string_terminals + self.terminal_symbols[num_terminals-1] + "}"
-        file.write(string_terminals + "\n") 
+        with tracer.phase("transform " + transformation):
+            if cache is None:
+                transform(verbose)
+                return
+                
+            fingerprint = grammarFingerprint(self, transformation)
+            normal_form = cache.load(fingerprint)
+            
+            if normal_form is not None:
+                self.replaceContent(*normal_form)
+                
+                if verbose or tracer.enabled:
+                    trace(verbose, "normal form read from the cache", "The grammar in " + transformation + " normal form has been read from the cache", transformation = transformation)
+                    
+                return
+            
+            transform(verbose)
+            cache.store(fingerprint, self)
+    
+    """
+    It writes the grammar in a file given the name of the file, or in a file
+    object already open (any object with the method write). Each line is 
+    written through the buffer of the file, joining the symbols only once.
+    """
+    
+    def writeGrammar(self, path_file):
+        if isinstance(path_file, (str, os.PathLike)):
+            with open(path_file, 'w', buffering = WRITE_BUFFER_SIZE) as file:
+                self.writeGrammar(file)
+                
+            return
+        
+        file = path_file
+        
+        # Write the variables and the terminal symbols
+        file.write("V = {" + ",".join(self.variable_symbols) + "}\n")
+        file.write("T = {" + ",".join(self.terminal_symbols) + "}\n")
         
         """A blank line before the production rules """
         file.write("\n")
         
         """ For each variable, consider all production rules in which
-        that variable coincides with the left part.
-        Separate all rules by | """
+        that variable coincides with the left part, which are already
+        grouped in the index of the productions. Separate all rules by | """
         
-        for variable in self.variable_symbols:
-            string_rules = variable + " -> "
-            appear_left_part = False
-                
-            for production_rule in self.production_rules:
-                if production_rule.left_part == variable:
-                    appear_left_part = True
-                    
-                    for symbol in production_rule.right_part:# Write each symbol in the right part           
-                        string_rules = string_rules + symbol
-                        
-                    string_rules = string_rules + "|"
-                    
+        rules_by_left_part = self.production_rules.rules_by_left_part
         
-            if appear_left_part: # If there are rules with that variable at the left part
-                string_rules = string_rules[:-1] # remove the last |
-                file.write(string_rules + "\n")
-                
-        file.close()
+        for variable in self.variable_symbols:
+            production_rules = rules_by_left_part.get(variable)
+            
+            if production_rules: # If there are rules with that variable at the left part
+                string_right_parts = "|".join(["".join(production_rule.right_part) for production_rule in production_rules])
+                file.write(variable + " -> " + string_right_parts + "\n")
     
     """ It validates a production rule by checking that all symbols 
     in both parts of the rule are in the variables or terminal symbols
@@ -306,35 +519,77 @@ class GenerativeGrammar:
     of the right part, checking whether they coincide. """
     
     def deteleProductionsWithSymbol(self, symbol, verbose = False):
-        i = 0
+        self.deleteProductionsWithSymbols({symbol}, verbose)
         
-        while i < len(self.production_rules):
-            production_rule = self.production_rules[i]
-            
-            if production_rule.left_part == symbol:
-                to_delete = True
-                
-            else:
-                to_delete = False
-                j = 0
-                num_symbols_right_part = len(production_rule.right_part)
+    """ It deletes the productions in which some of the symbols given appears,
+    going across the productions only once """
+        
+    def deleteProductionsWithSymbols(self, symbols, verbose = False):
+        rules_to_delete = []
+        
+        for production_rule in self.production_rules:
+            if production_rule.left_part in symbols or not symbols.isdisjoint(production_rule.right_part):
+                rules_to_delete.append(production_rule)
                 
-                while not to_delete and j < num_symbols_right_part:
-                    
-                    if production_rule.right_part[j] == symbol:
-                        to_delete = True
+                if verbose or tracer.enabled:
+                    trace(verbose, "production removed", "Deleting the production " + str(production_rule), rule = production_rule)
+        
+        # Remove all of them going across the list only once
+        self.production_rules.removeRules(rules_to_delete)
+        
+    """ It computes the variables that derive a word whose symbols are in the set
+    given (for instance, the terminal symbols, or the empty set for the variables
+    that derive the empty word), in the order they are found.
+    Basic condition: if all symbols of the right part of a production are in 
+    the set, the variable of the left part is included.
+    Recursive condition: if all symbols of the right part of a production are 
+    in the set or are variables included, the left part is included.
+    Each production keeps the number of symbols of its right part that are not
+    included yet, and each symbol the productions where it appears. When a 
+    variable is included, only the counters of its productions are decreased,
+    so each symbol of each production is considered only once. """
+    
+    def computeVariablesDerivingWords(self, symbols):
+        pending_symbols = [] # number of symbols not included of each production
+        rules_with_symbol = {} # symbol -> numbers of the productions where it appears (once per appearance)
+        variables_found = []
+        variables_included = set()
+        
+        for production_rule in self.production_rules:
+            num_pending = 0
+            
+            for symbol in production_rule.right_part:
+                if symbol not in symbols:
+                    rules_with_symbol.setdefault(symbol, []).append(len(pending_symbols))
+                    num_pending = num_pending + 1
                     
-                    else:
-                        j = j+1
-                        
-            if to_delete:
-                self.production_rules.remove(production_rule)
+            pending_symbols.append(num_pending)
+            
+            if num_pending == 0 and production_rule.left_part not in variables_included:
+                variables_included.add(production_rule.left_part)
+                variables_found.append(production_rule.left_part)
                 
-                if verbose:
-                    print("deleting the production " + production_rule)
+        """ The variables found are included one by one, decreasing the counters
+        of the productions where they appear """
+        
+        i = 0
+        
+        while i < len(variables_found):
+            variable = variables_found[i]
+            i = i+1
+            
+            for k in rules_with_symbol.get(variable, ()):
+                pending_symbols[k] = pending_symbols[k] - 1
+                left_part = self.production_rules[k].left_part
                 
-            else:
-                i = i+1
+                if pending_symbols[k] == 0 and left_part not in variables_included:
+                    variables_included.add(left_part)
+                    variables_found.append(left_part)
+                    
+        if tracer.enabled:
+            tracer.count("variables deriving words iterations", i)
+            
+        return variables_found
                 
     """It determines the variables that can be replaced by terminal symbols Vt
      If the right part of the rule is composed of terminal symbols, then the variable 
@@ -343,54 +598,7 @@ class GenerativeGrammar:
     of the left part belongs to Vt """
     
     def determineVarablesReplacedbyTerminals(self):
-        Vt = []
-        
-        """ For each production rule, if the variable of the left part
-        is not in Vt yet, check whether all elements of the right part
-        are terminal symbols """
-        
-        for production_rule in self.production_rules:
-            if production_rule.left_part not in Vt:
-                all_terminals = True;
-                i = 0;
-                num_symbols_right_part = len(production_rule.right_part)
-            
-                while all_terminals and i < num_symbols_right_part:
-                    if production_rule.right_part[i] not in self.terminal_symbols:
-                        all_terminals = False;
-                    
-                    else:
-                        i = i+1
-                        
-                if all_terminals:
-                    Vt.append(production_rule.left_part)
-                    
-        """ Include recursively all variables that can be eded in a terminal symbol 
-        Recursive condition: If all elements of the right part are in Vt, then 
-        the left part is in Vt""" 
-        
-                    
-        list_changed = True
-        
-        while list_changed:
-            list_changed = False
-            
-            for production_rule in self.production_rules:
-                if production_rule.left_part not in Vt: 
-                    all_replaced_by_terminal = True
-                    i = 0;
-                    num_symbols_right_part = len(production_rule.right_part)
-            
-                    while all_replaced_by_terminal and i < num_symbols_right_part:
-                        if production_rule.right_part[i] not in self.terminal_symbols and production_rule.right_part[i] not in Vt:
-                              all_replaced_by_terminal = False;
-                    
-                        else:
-                            i = i+1
-                            
-                    if all_replaced_by_terminal:
-                        Vt.append(production_rule.left_part)
-                        list_changed = True
+        Vt = self.computeVariablesDerivingWords(self.terminal_symbols)
         
         return Vt
     
@@ -401,28 +609,23 @@ class GenerativeGrammar:
     """
     
     def deleteVariablesNotReplacedByTerminals(self, verbose = False):
-        Vt = self.determineVarablesReplacedbyTerminals()
+        Vt = set(self.determineVarablesReplacedbyTerminals())
+        variables_to_delete = [variable for variable in self.variable_symbols if variable not in Vt]
         
-        i = 0         
-        while i < len(self.variable_symbols):
-            if self.variable_symbols[i] not in Vt:
-                self.deteleProductionsWithSymbol(self.variable_symbols[i])
-                
-                if verbose:
-                    print("Deleting the productions with symbol " + self.variable_symbols[i])
-                
-                if not self.variable_symbols[i] == self.start_symbol:
-                    if verbose:
-                        print("Deleting the symbol " + self.variable_symbols[i])
-                    
-                    self.variable_symbols.remove(self.variable_symbols[i])
-                    
-                    
-                else:
-                    i = i+1
-                    
-            else:
-                i = i+1
+        if verbose or tracer.enabled:
+            for variable in variables_to_delete:
+                trace(verbose, "productions of unproductive variable removed", "Deleting the productions with symbol " + variable, variable = variable)
+        
+        self.deleteProductionsWithSymbols(set(variables_to_delete))
+        
+        # The start symbol is kept, although its productions are deleted
+        variables_to_delete = [variable for variable in variables_to_delete if variable != self.start_symbol]
+        
+        if verbose or tracer.enabled:
+            for variable in variables_to_delete:
+                trace(verbose, "variable removed", "Deleting the symbol " + variable, variable = variable)
+        
+        self.variable_symbols.removeSymbols(set(variables_to_delete))
                       
     """ 
     It deletes the variables and terminal symbols that cannot be reaches from the start symbol.
@@ -430,66 +633,46 @@ class GenerativeGrammar:
     """
     
     def deleteSymbolsNotReachable(self, verbose = False):
-        variables_reachable = [self.start_symbol] # the variables found as rechable
+        variables_reachable = {self.start_symbol} # the variables found as rechable
         variables_to_analize = [self.start_symbol] # the variables to explore
-        terminal_symbols_reachable = [] # the terminal symbols found as rechable
+        terminal_symbols_reachable = set() # the terminal symbols found as rechable
         
         while len(variables_to_analize) >= 1: # while there are variables to explore
-            """ extract the first variable to explore """  
-            variable_to_explore = variables_to_analize[0] 
-            variables_to_analize.remove(variable_to_explore)
-            
-            """ go across the productions with that variable in the right part """
-            
-            for production_rule in self.production_rules:
-                
-                if production_rule.left_part == variable_to_explore:
-                    """Go across the symbols of the right part.
-                    If the symbol is a variable and is not included in the variables reachable
-                    include it in the variables reachable and to analyze
-                    If the symbol is terminal and is not included in the 
-                    terminal symbols reachable include it """
-                    for symbol in production_rule.right_part:
-                        if symbol in self.variable_symbols and symbol not in variables_reachable:
-                            variables_reachable.append(symbol)
-                            variables_to_analize.append(symbol)
-                            
-                        elif symbol in self.terminal_symbols and symbol not in terminal_symbols_reachable:
-                            terminal_symbols_reachable.append(symbol)
+            """ extract the last variable to explore """  
+            variable_to_explore = variables_to_analize.pop()
+            
+            """ go across the productions with that variable in the left part """
+            
+            for production_rule in self.production_rules.rulesWithLeftPart(variable_to_explore):
+                """Go across the symbols of the right part.
+                If the symbol is a variable and is not included in the variables reachable
+                include it in the variables reachable and to analyze
+                If the symbol is terminal and is not included in the 
+                terminal symbols reachable include it """
+                for symbol in production_rule.right_part:
+                    if symbol in self.variable_symbols and symbol not in variables_reachable:
+                        variables_reachable.add(symbol)
+                        variables_to_analize.append(symbol)
+                        
+                    elif symbol in self.terminal_symbols:
+                        terminal_symbols_reachable.add(symbol)
                 
         """ Delete the variables and terminal symbols that are not reachable from the
         initial symbol, as well as the productions where they appear """
         
-        i = 0
+        variables_to_delete = [variable for variable in self.variable_symbols if variable not in variables_reachable]
+        terminals_to_delete = [symbol for symbol in self.terminal_symbols if symbol not in terminal_symbols_reachable]
         
-        while i < len(self.variable_symbols):
-            variable = self.variable_symbols[i]
-                
-            if variable not in variables_reachable:
-                self.deteleProductionsWithSymbol(variable)
-                self.variable_symbols.remove(variable)
+        if verbose or tracer.enabled:
+            for variable in variables_to_delete:
+                trace(verbose, "variable removed", "Deleting the productions with the variable " + variable + "\nDeleting the variable " + variable, variable = variable)
                 
-                if verbose:
-                    print("Deleting the productions with the variable " + variable)
-                    print("Deleting the variable " + variable)
-                     
-            else:
-                i = i+1
-                    
-        i = 0
+            for symbol in terminals_to_delete:
+                trace(verbose, "terminal symbol removed", "Deleting the terminal symbol " + symbol, symbol = symbol)
         
-        while i < len(self.terminal_symbols):
-            symbol = self.terminal_symbols[i]
-                
-            if symbol not in terminal_symbols_reachable:
-                self.deteleProductionsWithSymbol(symbol)
-                self.terminal_symbols.remove(symbol)
-                
-                if verbose:
-                    print("Deleting the terminal symbol " + symbol)
-                     
-            else:
-                i = i+1
+        self.deleteProductionsWithSymbols(set(variables_to_delete + terminals_to_delete))
+        self.variable_symbols.removeSymbols(set(variables_to_delete))
+        self.terminal_symbols.removeSymbols(set(terminals_to_delete))
                      
             
     """It deletes the useless symbols and productions of the grammar. 
@@ -500,15 +683,16 @@ class GenerativeGrammar:
     
     
     def deleteUselessSymbolsProductions(self, verbose = False):
-        if verbose:
-            print("Deleting the variables that cannot be replaced by terminal symbols")
+        with tracer.phase("deleteUselessSymbolsProductions"):
+            if verbose or tracer.enabled:
+                trace(verbose, "useless symbols step", "Deleting the variables that cannot be replaced by terminal symbols", step = "unproductive")
+                
+            self.deleteVariablesNotReplacedByTerminals(verbose)
             
-        self.deleteVariablesNotReplacedByTerminals(verbose)
-        
-        if verbose:
-            print("Deleting the variables and symbols not reachable from the initial symbol")
-        
-        self.deleteSymbolsNotReachable(verbose)
+            if verbose or tracer.enabled:
+                trace(verbose, "useless symbols step", "Deleting the variables and symbols not reachable from the initial symbol", step = "unreachable")
+            
+            self.deleteSymbolsNotReachable(verbose)
     
     
     """ It computes the set of nullable variables. 
@@ -520,41 +704,8 @@ class GenerativeGrammar:
     """
     
     def computeNullableVariables(self):
-        nullable_variables = []
-        
-        """If A -> \epsion, then A is nullable"""
-        for production_rule in self.production_rules: 
-            if production_rule.left_part not in nullable_variables:
-                if len(production_rule.right_part) == 0:
-                    nullable_variables.append(production_rule.left_part)
-            
-        """While there are changes in the list of nullable variables,
-        Go across the productions for which the left part is not in the list
-        If the all symbols in the left part are nullable, then the 
-        variable of the left part is also nullable. """ 
-        
-        list_changed = True
-        
-        while list_changed:
-            list_changed = False
-            
-            for production_rule in self.production_rules: 
-                if production_rule.left_part not in nullable_variables:
-                    #Search for a non-nullable symbol in the right part
-                    all_nullable = True
-                    num_symbols_right_part = len(production_rule.right_part)
-                    i = 0
-                    
-                    while all_nullable and i < num_symbols_right_part:
-                        if production_rule.right_part[i] not in nullable_variables:
-                            all_nullable = False
-                            
-                        else:
-                            i = i+1
-        
-                    if all_nullable:
-                        nullable_variables.append(production_rule.left_part)
-                        list_changed = True
+        # The nullable variables derive a word without symbols
+        nullable_variables = self.computeVariablesDerivingWords(frozenset())
                         
         return nullable_variables
     
@@ -562,105 +713,165 @@ class GenerativeGrammar:
     """ It eliminates the null productions of the grammar: Firstly, 
     the set of variables that can generate the empty work is computed. 
     Then, the null productions are deleted, adding the productions that
-    compensate the elimination. """
+    compensate the elimination. 
+    A production with k nullable symbols gives up to 2^k productions. With
+    binarize = True, the productions with more than two nullable symbols 
+    A -> X1X2...Xm are replaced first by A -> X1<N1>, <N1> -> X2<N2>, ...,
+    <Nm-2> -> Xm-1Xm, so each production gives at most 3 productions and
+    the number of productions added is linear in the size of the grammar. """
     
-    def deleteNullProductions(self, verbose = False):
-        nullable_variables = self.computeNullableVariables()
+    def deleteNullProductions(self, verbose = False, binarize = False):
+        with tracer.phase("deleteNullProductions"):
+            nullable_list = self.computeNullableVariables()
+            nullable_variables = set(nullable_list)
         
-        if verbose: 
-            print("List of nullable variables ")
-            print(nullable_variables)
+            if verbose or tracer.enabled:
+                trace(verbose, "nullable variables", "List of nullable variables \n" + str(nullable_list), variables = nullable_list)
 
-        i = 0
+            # Delete the null productions (indexed without first symbol)
+            null_production_rules = self.production_rules.rulesStartingWith(None)
+            self.production_rules.removeRules(null_production_rules)
         
-        # Delete the null productions
-        while i < len(self.production_rules):
-            production_rule = self.production_rules[i]
-            
-            if len(production_rule.right_part) == 0:
-                 self.production_rules.remove(production_rule)
-                 
-                 if verbose:
-                     print("Removing the production ")
-                     print(production_rule)
-                 
-            else:
-                i = i+1
+            if verbose or tracer.enabled:
+                for production_rule in null_production_rules:
+                    trace(verbose, "production removed", "Removing the production " + str(production_rule), rule = production_rule)
+                
+            if binarize:
+                self.binarizeNullableProductions(nullable_variables, verbose)
         
-        rules_to_add = [] # The rules to add for compensating the elimination of the null productions
+            rules_to_add = [] # The rules to add for compensating the elimination of the null productions
+            rules_found = set()
                 
-        for production_rule in self.production_rules:
-           """Compute the list of the nullable symbols in the right part"""
+            for production_rule in self.production_rules:
+               """ Compute the right parts obtained by removing each subset of the 
+               positions with nullable symbols, going across the right part: each
+               right part obtained is extended with the symbol, and also kept without
+               it if the symbol is nullable. The right parts are the keys of a 
+               dictionary, so equal right parts are obtained once, in the same order
+               in every execution """
            
-           nullable_symbols_right_part = []
-            
-           for symbol in production_rule.right_part:
-                if symbol in nullable_variables:
-                    nullable_symbols_right_part.append(symbol)
-                    
-             
-           # Extract the subsets of nullable symbols     
-           subsets_nullable = get_powerset(nullable_symbols_right_part)
-                
-           """For each subset of nullable symbols that is not the total one,
-           Add a new production rule with the same left part and the nullable
-           symbols that are not in set subset, whenever the new production is 
-           not null (has at least one symbol in the right part)"""
-           for subset_nullable in subsets_nullable:
-               if len(subset_nullable) > 0:
-                   symbols_new_right_part = []
-                   
-                   for symbol in production_rule.right_part:
-                       if symbol not in nullable_symbols_right_part or symbol not in subset_nullable:
-                            symbols_new_right_part.append(symbol)
+               new_right_parts = {(): None}
+           
+               for symbol in production_rule.right_part:
+                   extended_right_parts = dict.fromkeys(right_part + (symbol,) for right_part in new_right_parts)
+               
+                   if symbol in nullable_variables:
+                       new_right_parts.update(extended_right_parts)
                    
-                   if len(symbols_new_right_part) > 0: # Check that the new production is not null
-                       new_production_rule = ProductionRule(production_rule.left_part, symbols_new_right_part)
-                       rules_to_add.append(new_production_rule)
-                         
-                       if verbose:
-                           print("Adding the production ")
-                           print(new_production_rule)
+                   else:
+                       new_right_parts = extended_right_parts
+                
+               """ Add a new production rule with the same left part for each right part
+               that is not the one of the production, whenever the new production is 
+               not null (has at least one symbol in the right part)"""
            
+               for new_right_part in new_right_parts:
+                   if len(new_right_part) > 0 and new_right_part != production_rule.right_part:
+                       new_production_rule = ProductionRule(production_rule.left_part, new_right_part)
+                   
+                       if new_production_rule not in rules_found:
+                           rules_found.add(new_production_rule)
+                           rules_to_add.append(new_production_rule)
         
-           """ Add the rules that are not in the rules of the grammar """
+            """ Add the rules that are not in the rules of the grammar """
             
-        for rule in rules_to_add:
-            if rule not in self.production_rules:
-                self.production_rules.append(rule)
+            for rule in rules_to_add:
+                if rule not in self.production_rules:
+                    self.production_rules.append(rule)
+                
+                    if verbose or tracer.enabled:
+                        trace(verbose, "production added", "Adding the production " + str(rule), rule = rule)
+                    
+    """ It replaces each production A -> X1X2...Xm with more than two nullable
+    symbols by A -> X1<N1>, <N1> -> X2<N2>, ..., <Nm-2> -> Xm-1Xm, where 
+    <N1>, ..., <Nm-2> are new variables. The new variables whose symbols are
+    all nullable are added to the nullable variables. """
+    
+    def binarizeNullableProductions(self, nullable_variables, verbose = False):
+        counter_new_variables = 1 # counter for the variables Ni to add
+        
+        for k in range(len(self.production_rules)):
+            production_rule = self.production_rules[k]
+            right_part = production_rule.right_part
+            num_nullable = sum(1 for symbol in right_part if symbol in nullable_variables)
+            
+            if num_nullable <= 2:
+                continue
+            
+            """ The variables are created from the end of the right part, so 
+            it is known whether the rest of the right part is nullable """
+            
+            num_symbols_right_part = len(right_part)
+            next_part = (right_part[-2], right_part[-1])
+            all_nullable = right_part[-2] in nullable_variables and right_part[-1] in nullable_variables
+            
+            for j in reversed(range(1, num_symbols_right_part - 1)):
+                new_variable = "<N" + str(counter_new_variables) + ">"
+                counter_new_variables = counter_new_variables + 1
+                
+                while new_variable in self.variable_symbols:
+                    new_variable = "<N" + str(counter_new_variables) + ">"
+                    counter_new_variables = counter_new_variables + 1
+                    
+                self.variable_symbols.append(new_variable)
+                new_production_rule = ProductionRule(new_variable, next_part)
+                self.production_rules.append(new_production_rule)
+                
+                if all_nullable:
+                    nullable_variables.add(new_variable)
+                    
+                if verbose or tracer.enabled:
+                    trace(verbose, "variable added", "Adding the variable " + new_variable, variable = new_variable)
+                    trace(verbose, "production added", "Adding the production " + str(new_production_rule), rule = new_production_rule)
+                
+                next_part = (right_part[j - 1], new_variable)
+                all_nullable = all_nullable and right_part[j - 1] in nullable_variables
+                
+            """ Replace the rule through the list of rules, so that
+            its indexes are updated """
+            self.production_rules[k] = ProductionRule(production_rule.left_part, next_part)
+            
+            if verbose or tracer.enabled:
+                trace(verbose, "production replaced", "Replacing the production " + str(production_rule) + " with the production " + str(self.production_rules[k]),
+                      rule = production_rule, new_rule = self.production_rules[k])
        
     """It computes H = the set of pairs (A,B) such that B is derivable from A 
         Basic condition: if A-> B, then (A,B) belongs to H
         Recursive condition:If (A,B) (B,C) belong to H, then 
-        (A,C) belongs to H"""
+        (A,C) belongs to H
+        The variables are numbered, and the variables derivable from each
+        variable are kept as the bits of an integer. The recursive condition 
+        is applied with the algorithm of Warshall: for each variable B, the
+        variables derivable from B are added to the variables A with B 
+        derivable from A."""
         
     def computeSetDerivablePairs(self):
-        set_derivable_pairs = []
+        variables = list(self.variable_symbols)
+        variable_index = {variable: i for i, variable in enumerate(variables)}
+        derivable_variables = [0] * len(variables)
         
         """Insert the pairs (A,B) for which there is a production A -> B """
         
         for production_rule in self.production_rules:
-            if len (production_rule.right_part) == 1 and production_rule.right_part[0] in self.variable_symbols:
-                new_tuple = (production_rule.left_part, production_rule.right_part[0])
-                set_derivable_pairs.append(new_tuple)
-                
-        list_changed = True
-        
-        while list_changed:
-            list_changed = False
-            num_pairs = len(set_derivable_pairs)
-            
-            #Search for the pairs of tuples (A,B), (B, C) in H 
-            # to insert (A, C) in H if there is not in the list yet
-            for i in range(0,num_pairs-1):
-                for j in range(i+1, num_pairs):
-                    if set_derivable_pairs[i][1] == set_derivable_pairs[j][0]:
-                        new_tuple = (set_derivable_pairs[i][0], set_derivable_pairs[j][1])
-                        
-                        if new_tuple not in set_derivable_pairs:
-                            set_derivable_pairs.append(new_tuple)
-                            list_changed = True
+            if len(production_rule.right_part) == 1 and production_rule.right_part[0] in variable_index and production_rule.left_part in variable_index:
+                derivable_variables[variable_index[production_rule.left_part]] |= 1 << variable_index[production_rule.right_part[0]]
                 
+        for k in range(len(variables)):
+            bit_k = 1 << k
+            
+            for i in range(len(variables)):
+                if derivable_variables[i] & bit_k:
+                    derivable_variables[i] |= derivable_variables[k]
+                    
+        if tracer.enabled:
+            tracer.count("derivable pairs iterations", len(variables))
+            
+        set_derivable_pairs = []
+                    
+        for i in range(len(variables)):
+            for j in range(len(variables)):
+                if derivable_variables[i] >> j & 1:
+                    set_derivable_pairs.append((variables[i], variables[j]))
         
         return set_derivable_pairs
         
@@ -670,42 +881,45 @@ class GenerativeGrammar:
     compensate the elimination. """
     
     def deleteUnitaryProductions(self, verbose = False):
-        set_derivable_pairs = self.computeSetDerivablePairs()
+        with tracer.phase("deleteUnitaryProductions"):
+            set_derivable_pairs = self.computeSetDerivablePairs()
         
-        if verbose:
-            print("List of derivable pairs ")
-            print(set_derivable_pairs)
+            if verbose or tracer.enabled:
+                trace(verbose, "derivable pairs", "List of derivable pairs \n" + str(set_derivable_pairs), pairs = set_derivable_pairs)
             
-        # delete the unitary productions
-        i = 0
+            # delete the unitary productions
+            unitary_production_rules = []
         
-        while i < len(self.production_rules):
-            production_rule = self.production_rules[i]
-            
-            if len (production_rule.right_part) == 1 and production_rule.right_part[0] in self.variable_symbols:
-                self.production_rules.remove(production_rule)
+            for production_rule in self.production_rules:
+                if len (production_rule.right_part) == 1 and production_rule.right_part[0] in self.variable_symbols:
+                    unitary_production_rules.append(production_rule)
                 
-                if verbose:
-                    print("Deleting the production ")
-                    print(production_rule)
+                    if verbose or tracer.enabled:
+                        trace(verbose, "production removed", "Deleting the production " + str(production_rule), rule = production_rule)
                 
-            else:
-                i = i+1
+            self.production_rules.removeRules(unitary_production_rules)
                 
-        """ For each tuple (A,B) in the set of derivable pairs, 
-        for each production A->alpha, add a production B -> alpha """
+            """ For each tuple (A,B) in the set of derivable pairs, 
+            for each production B->alpha, add a production A -> alpha.
+            The productions of B are taken from the index before adding any
+            production, and the productions added are not repeated """
         
-        for pair in set_derivable_pairs:
-            for production_rule in self.production_rules:
-                if production_rule.left_part == pair[1]:
+            rules_to_add = []
+            rules_found = set()
+        
+            for pair in set_derivable_pairs:
+                for production_rule in self.production_rules.rules_by_left_part.get(pair[1], ()):
                     new_production_rule = ProductionRule(pair[0], production_rule.right_part)
+                
+                    if new_production_rule not in self.production_rules and new_production_rule not in rules_found:
+                        rules_found.add(new_production_rule)
+                        rules_to_add.append(new_production_rule)
                     
-                    if new_production_rule not in self.production_rules:
-                        self.production_rules.append(new_production_rule)
-                        
-                        if verbose:
-                           print("Adding the production ")
-                           print(new_production_rule)
+            for new_production_rule in rules_to_add:
+                self.production_rules.append(new_production_rule)
+                    
+                if verbose or tracer.enabled:
+                    trace(verbose, "production added", "Adding the production " + str(new_production_rule), rule = new_production_rule)
         
         
     """ It tranforms the grammar into the normal Chomsky form. 
@@ -715,16 +929,26 @@ class GenerativeGrammar:
     Secondly, for each production with m variables, wth m >= 3, m-2 
     variables are added, and the production is replaced by a set of 
     productions of length 2
+    With binarize_null = True, the null productions are deleted with 
+    deleteNullProductions(binarize = True), so the number of productions
+    added does not grow exponentially with the nullable symbols of the
+    productions.
     """
     
-    def transformChomsky(self, verbose = False):
-       self.deleteNullProductions(verbose)
+    def transformChomsky(self, verbose = False, cache = None, binarize_null = False):
+        transformation = "chomsky (binarized null productions)" if binarize_null else "chomsky"
+        self.applyTransformation(transformation, partial(self.computeChomsky, binarize_null = binarize_null), verbose, cache)
+        
+    def computeChomsky(self, verbose = False, binarize_null = False):
+       self.deleteNullProductions(verbose, binarize_null)
        self.deleteUnitaryProductions(verbose)
                
-       for production_rule in self.production_rules:
+       for k in range(len(self.production_rules)):
+          production_rule = self.production_rules[k]
           num_symbols_right_part = len(production_rule.right_part)
           
           if num_symbols_right_part > 1: # Go accross the non-unitary productions
+               new_right_part = list(production_rule.right_part)
                
                for i in range(num_symbols_right_part):
                    symbol = production_rule.right_part[i]
@@ -735,66 +959,97 @@ class GenerativeGrammar:
                       """Add a production of the form Ca -> a, if not added """
                       if variable_to_add not in self.variable_symbols: 
                            self.variable_symbols.append(variable_to_add)
-                           
-                           if verbose:
-                               print("Adding the variable " + variable_to_add)
-                           
                            new_production_rule = ProductionRule(variable_to_add, [symbol])
                            self.production_rules.append(new_production_rule)
                            
-                           if verbose:
-                               print("Adding the production ")
-                               print(new_production_rule)
+                           if verbose or tracer.enabled:
+                               trace(verbose, "variable added", "Adding the variable " + variable_to_add, variable = variable_to_add)
+                               trace(verbose, "production added", "Adding the production " + str(new_production_rule), rule = new_production_rule)
                         
                       """Replace a with Ca in the production"""
-                      production_rule.right_part[i] = variable_to_add
-            
-       i = 0
+                      new_right_part[i] = variable_to_add
+                      
+               """ Replace the rule through the list of rules, so that
+               its indexes are updated """
+               self.production_rules[k] = ProductionRule(production_rule.left_part, new_right_part)
+            
+       """ Replace each production A -> B1...Bm with m>=3 by A -> B1D, where D 
+       is the variable of the suffix B2...Bm. The variable of a suffix 
+       Bj...Bm has the production D -> BjD', where D' is the variable of 
+       Bj+1...Bm, or D -> Bm-1Bm for the last two symbols. The variables are
+       kept by the right part of their production, which determines the 
+       suffix, so the productions with a common suffix share its variables,
+       only one variable is added per different suffix, and each symbol of
+       the suffix only needs to look up a pair of symbols """
+       
+       pair_variables = {} # right part of a production added -> its variable
        counter_new_variables = 1 # counter for the variables Di to add
+       
+       """ It returns the variable with the production D -> XY for the pair 
+       (X, Y), adding it and its production if they do not exist yet """
+       
+       def pairVariable(pair):
+           nonlocal counter_new_variables
+           
+           if pair in pair_variables:
+               return pair_variables[pair]
+           
+           new_variable = "<D" + str(counter_new_variables) + ">"
+           counter_new_variables = counter_new_variables + 1
+           
+           while new_variable in self.variable_symbols:
+               new_variable = "<D" + str(counter_new_variables) + ">"
+               counter_new_variables = counter_new_variables + 1
+           
+           self.variable_symbols.append(new_variable)
+           pair_variables[pair] = new_variable
+           new_production = ProductionRule(new_variable, pair)
+           self.production_rules.append(new_production)
+           
+           if verbose or tracer.enabled:
+               trace(verbose, "variable added", "Adding the variable " + new_variable, variable = new_variable)
+               trace(verbose, "production added", "Adding the production " + str(new_production), rule = new_production)
+               
+           return new_variable
+       
+       num_production_rules = len(self.production_rules) # The productions added have two symbols
          
-       for i in range(len(self.production_rules)):
-          production_rule = self.production_rules[i] 
-          num_symbols_right_part = len(production_rule.right_part)
+       for k in range(num_production_rules):
+          production_rule = self.production_rules[k] 
+          right_part = production_rule.right_part
           
-          if num_symbols_right_part > 2: # For each production A-> B1...Bm with m>=3
-              """
-              Add the productions of the form A -> B1D1, D1 -> B2D2,,... Dm-2->Bm-1Bm
-              """
-              previous_variable = production_rule.left_part
-        
-              for j in range(num_symbols_right_part - 2):
-                  new_variable = "<D" + str(counter_new_variables) + ">"
-                  self.variable_symbols.append(new_variable)
-                  
-                  if verbose:
-                      print("Adding the variable " + new_variable)
-                  
-                  counter_new_variables = counter_new_variables + 1
-                  new_right_part = [production_rule.right_part[j], new_variable]
-                  new_production = ProductionRule(previous_variable, new_right_part)
-                  self.production_rules.append(new_production)
-                  previous_variable = new_variable
+          if len(right_part) > 2: # For each production A-> B1...Bm with m>=3
+              """ The variables of the suffixes are obtained from the last two
+              symbols backwards, so there is no recursion, whatever the length
+              of the suffix """
+              
+              suffix_variable = pairVariable((right_part[-2], right_part[-1]))
+              
+              for i in reversed(range(1, len(right_part) - 2)):
+                  suffix_variable = pairVariable((right_part[i], suffix_variable))
                   
-                  if verbose:
-                      print("Adding the production ")
-                      print(new_production)
-
-              new_right_part = [production_rule.right_part[num_symbols_right_part - 2], production_rule.right_part[num_symbols_right_part - 1]]
-              new_production = ProductionRule(previous_variable, new_right_part)
-              self.production_rules.append(new_production)
-             
-              if verbose:
-                 print("Adding the production ")
-                 print(new_production)
+              new_right_part = (right_part[0], suffix_variable)
               
-              self.production_rules.remove(production_rule) # Delete A -> B1....Bm
-
-              if verbose:
-                  print("Removing the production ")
-                  print(production_rule)
+              """ Replace A -> B1....Bm through the list of rules, so that
+              its indexes are updated """
+              self.production_rules[k] = ProductionRule(production_rule.left_part, new_right_part)
 
-          else:
-              i = i+1
+              if verbose or tracer.enabled:
+                  trace(verbose, "production replaced", "Replacing the production " + str(production_rule) + " with the production " + str(self.production_rules[k]),
+                        rule = production_rule, new_rule = self.production_rules[k])
+                  
+       if verbose or tracer.enabled:
+           size = self.computeSize()
+           trace(verbose, "chomsky normal form size", "Size of the grammar in Chomsky normal form\n" + str(size), **size)
+           
+    """ It returns the size of the grammar: number of variables, terminal 
+    symbols and productions, and total number of symbols in the right parts """
+           
+    def computeSize(self):
+        num_symbols = sum(len(production_rule.right_part) for production_rule in self.production_rules)
+        
+        return {"variables": len(self.variable_symbols), "terminals": len(self.terminal_symbols), 
+                "productions": len(self.production_rules), "symbols": num_symbols}
     
     """It checks whether the conditions for transform the grammar in the 
     Greibach Normal Form are satisfied. Such conditions are:
@@ -814,9 +1069,8 @@ class GenerativeGrammar:
             if num_symbols_right_part == 1 and production_rule.right_part[0] not in self.terminal_symbols:
                 conditions_satisfied = False
                 
-                if verbose:
-                    print("Greibach cannot be applied due to the production ")
-                    print(production_rule)
+                if verbose or tracer.enabled:
+                    trace(verbose, "greibach not applicable", "Greibach cannot be applied due to the production " + str(production_rule), rule = production_rule)
             
             #If the production is not non-unitary, then all symbols from the second one must be variables
             else:
@@ -834,9 +1088,8 @@ class GenerativeGrammar:
                 if non_terminal_found:
                     conditions_satisfied = False
                     
-                    if verbose:
-                        print("Greibach cannot be applied due to the production ")
-                        print(production_rule)
+                    if verbose or tracer.enabled:
+                        trace(verbose, "greibach not applicable", "Greibach cannot be applied due to the production " + str(production_rule), rule = production_rule)
                     
             i = i+1
         
@@ -848,26 +1101,41 @@ class GenerativeGrammar:
     """
     
     def firstDeletionGreibach(self, production_to_delete, verbose = False):
-        self.production_rules.remove(production_to_delete)
-        
-        if verbose:
-           print("Deleting the production ")
-           print(production_to_delete)
-        
-        first_variable_right = production_to_delete.right_part[0]
-        remaining_right_part = production_to_delete.right_part[1:]
-        
-        for production_rule in self.production_rules:
-            if production_rule.left_part == first_variable_right:
+        self.firstDeletionsGreibach([production_to_delete], verbose)
+
+    """ It applies the first deletion operation to each one of the productions
+    given, which are removed going across the list of productions only once.
+    The productions of each variable B are the ones in the grammar when the
+    productions are removed, so the productions added are not used """
+
+    def firstDeletionsGreibach(self, productions_to_delete, verbose = False):
+        if len(productions_to_delete) == 0:
+            return
+
+        self.production_rules.removeRules(productions_to_delete)
+
+        if verbose or tracer.enabled:
+            for production_to_delete in productions_to_delete:
+                trace(verbose, "production removed", "Deleting the production " + str(production_to_delete), rule = production_to_delete)
+
+        productions_of_variable = {} # B -> productions B -> beta
+
+        for production_to_delete in productions_to_delete:
+            first_variable_right = production_to_delete.right_part[0]
+            remaining_right_part = production_to_delete.right_part[1:]
+
+            if first_variable_right not in productions_of_variable:
+                productions_of_variable[first_variable_right] = self.production_rules.rulesWithLeftPart(first_variable_right)
+
+            for production_rule in productions_of_variable[first_variable_right]:
                 new_right_part = production_rule.right_part + remaining_right_part
                 new_production_rule = ProductionRule(production_to_delete.left_part, new_right_part)
-                
+
                 if new_production_rule not in self.production_rules:
                     self.production_rules.append(new_production_rule)
-                    
-                    if verbose:
-                        print("Adding the production ")
-                        print(new_production_rule)
+
+                    if verbose or tracer.enabled:
+                        trace(verbose, "production added", "Adding the production " + str(new_production_rule), rule = new_production_rule)
         
     """Second deletion operation of the Greibach algorithm. Given a 
     variable A, delete all productions of the form A-> A alpha
@@ -883,69 +1151,52 @@ class GenerativeGrammar:
         if string_new_variable not in self.variable_symbols:
             self.variable_symbols.append(string_new_variable)
             
-            if verbose:
-                print("Adding the variable " + string_new_variable)
+            if verbose or tracer.enabled:
+                trace(verbose, "variable added", "Adding the variable " + string_new_variable, variable = string_new_variable)
         
-        i = 0
-        while i < len(self.production_rules):
-            production_rule = self.production_rules[i]
-            if production_rule.left_part == variable:
-                # If the production is of the form A -> A\alpha
-                if production_rule.right_part[0] == variable:
+        rules_to_delete = []
+        
+        for production_rule in self.production_rules.rulesWithLeftPart(variable):
+            # If the production is of the form A -> A\alpha
+            if len(production_rule.right_part) > 0 and production_rule.right_part[0] == variable:
 
-                    remaining_right_part = production_rule.right_part[1:] # Extract \alpha
-                    # Add B_A -> alpha
-                    new_rule1 = ProductionRule(string_new_variable, remaining_right_part)
-                     # Add B_A -> alphaB_A
-                    new_right_part = remaining_right_part + [string_new_variable]
-                    new_rule2 = ProductionRule(string_new_variable, new_right_part)
-                
-                    if new_rule1 not in self.production_rules:
-                        rules_to_add.append(new_rule1)
-                        
-                        if verbose:
-                           print("Adding the production " + new_rule1)
-                           print(new_rule1)
-                           
-                    if new_rule2 not in self.production_rules:
-                        rules_to_add.append(new_rule2)
-                        
-                        if verbose:
-                           print("Adding the production ")
-                           print(new_rule2)
-                        
-                    self.production_rules.remove(production_rule)
+                remaining_right_part = production_rule.right_part[1:] # Extract \alpha
+                # Add B_A -> alpha
+                new_rule1 = ProductionRule(string_new_variable, remaining_right_part)
+                 # Add B_A -> alphaB_A
+                new_right_part = remaining_right_part + (string_new_variable,)
+                new_rule2 = ProductionRule(string_new_variable, new_right_part)
+            
+                if new_rule1 not in self.production_rules:
+                    rules_to_add.append(new_rule1)
+                       
+                if new_rule2 not in self.production_rules:
+                    rules_to_add.append(new_rule2)
                     
-                    if verbose:
-                           print("Removing the production ")
-                           print(production_rule)
-
-                # If the production is A -> \betha, and \betha
-                #  does not start by A, then add the rule A -> \bethaB_A 
+                rules_to_delete.append(production_rule)
                 
-                else: 
-                    new_right_part = production_rule.right_part + [string_new_variable]
-                    new_rule = ProductionRule(production_rule.left_part, new_right_part)
-                    
-                    if new_rule not in self.production_rules:
-                        rules_to_add.append(new_rule)
-                        
-                        if verbose:
-                           print("Adding the production ")
-                           print(new_rule)
-                        
-                    i = i+1
+                if verbose or tracer.enabled:
+                       trace(verbose, "production removed", "Removing the production " + str(production_rule), rule = production_rule)
 
-            else:
-                i = i+1
+            # If the production is A -> \betha, and \betha
+            #  does not start by A, then add the rule A -> \bethaB_A 
+            
+            else: 
+                new_right_part = production_rule.right_part + (string_new_variable,)
+                new_rule = ProductionRule(production_rule.left_part, new_right_part)
                 
+                if new_rule not in self.production_rules:
+                    rules_to_add.append(new_rule)
             
-        for new_rule in rules_to_add:
-            self.production_rules.append(new_rule)
+        self.production_rules.removeRules(rules_to_delete)
             
-            if verbose:
-                print("Adding the production ")
-                print(new_rule)
+        # The productions are reported once, when they are added
+        for new_rule in rules_to_add:
+            if new_rule not in self.production_rules:
+                self.production_rules.append(new_rule)
+                
+                if verbose or tracer.enabled:
+                    trace(verbose, "production added", "Adding the production " + str(new_rule), rule = new_rule)
     
     """First part of the Greibach algorithm. It aims that all productions have the form
     A -> a\alpha, A_i -> A_j\alpha, B_j -> Ai\alpha, where Bk is the variable that is
@@ -953,154 +1204,262 @@ class GenerativeGrammar:
     
     def first_part_Greibach(self, verbose = True):
         num_variables = len(self.variable_symbols)
-        num_production_rules = len(self.production_rules)
         
         for i in range(num_variables): # for each i = 1...m
             for j in range(i): #f for each j = 1,,,i-1
-                k = 0
-                while k < num_production_rules:
-                    production_rule = self.production_rules[k]
-                    """For each production of the form Ai -> Aj\alpha
-                    Detele  Ai -> Aj\alpha with the first deletion """
-                    if production_rule.left_part == self.variable_symbols[i] and production_rule.right_part[0] == self.variable_symbols[j]:
-                        self.firstDeletionGreibach(production_rule)
-                        
-                        if verbose:
-                            print("Making the first deletion of the Greibach algorithm with the production ")
-                            print(production_rule)
-        
-                    else:
-                        k = k+1
+                """For each production of the form Ai -> Aj\alpha
+                Detele  Ai -> Aj\alpha with the first deletion. The productions
+                are the ones in the grammar at the start of the pass """
+                productions_to_delete = self.production_rules.rulesWithLeftPartStartingWith(self.variable_symbols[i], self.variable_symbols[j])
+                self.firstDeletionsGreibach(productions_to_delete)
+                
+                for production_rule in productions_to_delete:
+                    if verbose or tracer.enabled:
+                        trace(verbose, "greibach first deletion", "Making the first deletion of the Greibach algorithm with the production " + str(production_rule), rule = production_rule)
         
             """ If there is a production of the form Ai -> Ai\alpha
              Delete Ai with the first operation """
-            k = 0
-            while k < num_production_rules:
-                production_rule = self.production_rules[k]
-                
-                if production_rule.left_part == self.variable_symbols[i] and production_rule.right_part[0] == self.variable_symbols[i]:
-                   self.secondDeletionGreibach(self.variable_symbols[i])
-                  
-                   if verbose:
-                       print("Making the second deletion of the Greibach algorithm with the variable " + self.variable_symbols[i])
-                    
-                else:
-                    k = k+1
+            if len(self.production_rules.rulesWithLeftPartStartingWith(self.variable_symbols[i], self.variable_symbols[i])) > 0:
+               self.secondDeletionGreibach(self.variable_symbols[i])
+              
+               if verbose or tracer.enabled:
+                   trace(verbose, "greibach second deletion", "Making the second deletion of the Greibach algorithm with the variable " + self.variable_symbols[i], variable = self.variable_symbols[i])
     """Second and last part of the Greibach algorithm """
     
     def second_part_Greibach(self, verbose = True):
         num_variables = len(self.variable_symbols)
-        num_production_rules = len(self.production_rules)
         
         """For each i = m-1...1. For each production of the form A_i -> A_j\alpha, j > i,
         Delete A_i -> A_j\alpha with the first operation """
         for i in reversed(range(num_variables - 1)):
             for j in range(i+1, num_variables):
-                k = 0
-                while k < num_production_rules:
-                    production_rule = self.production_rules[k]
-                    
-                    if production_rule.left_part == self.variable_symbols[i] and  production_rule.right_part[0] == self.variable_symbols[j]:
-                        self.firstDeletionGreibach(production_rule)
-                           
-                        if verbose:
-                            print("Making the first deletion of the Greibach algorithm with the production ")
-                            print(production_rule)
+                productions_to_delete = self.production_rules.rulesWithLeftPartStartingWith(self.variable_symbols[i], self.variable_symbols[j])
+                self.firstDeletionsGreibach(productions_to_delete)
+                
+                for production_rule in productions_to_delete:
+                    if verbose or tracer.enabled:
+                        trace(verbose, "greibach first deletion", "Making the first deletion of the Greibach algorithm with the production " + str(production_rule), rule = production_rule)
                     
-                    else:
-                        k = k+1
         """ For each i = 1,2...m. For each production B_j -> A_i\alpha
         Delete  B_j -> A_i\alpha with the first operation """
          
         for i in range(num_variables):
             for j in range(num_variables):
                 string_added = "<B" + self.variable_symbols[j] + ">"
-                k = 0
-                while k < num_production_rules:
-                    production_rule = self.production_rules[k]
-                    if production_rule.left_part == string_added and production_rule.right_part[0] == self.variable_symbols[i]:
-                        self.firstDeletionGreibach(production_rule)
-                        
-                        if verbose:
-                            print("Making the first deletion of the Greibach algorithm with the production")
-                            print(production_rule)
-
-                    else:
-                        k = k+1
+                
+                productions_to_delete = self.production_rules.rulesWithLeftPartStartingWith(string_added, self.variable_symbols[i])
+                self.firstDeletionsGreibach(productions_to_delete)
+                
+                for production_rule in productions_to_delete:
+                    if verbose or tracer.enabled:
+                        trace(verbose, "greibach first deletion", "Making the first deletion of the Greibach algorithm with the production " + str(production_rule), rule = production_rule)
                         
                     
 
     """It transform the grammar into the Greibach normal form via the two parts described above """
     
-    def transformGreibach(self, verbose = False):
+    def transformGreibach(self, verbose = False, cache = None):
+        self.applyTransformation("greibach", self.computeGreibach, verbose, cache)
+        
+    def computeGreibach(self, verbose = False):
+        
+        if verbose or tracer.enabled:
+            trace(verbose, "greibach part", "Running the first part of the Greibach algorithm", part = 1)
         
-        if verbose:
-            print("Running the first part of the Greibach algorithm")
+        with tracer.phase("greibach first part"):
+            self.first_part_Greibach(verbose)
         
-        self.first_part_Greibach(verbose)
+        if verbose or tracer.enabled:
+            trace(verbose, "greibach part", "Running the second part of the Greibach algorithm", part = 2)
         
-        if verbose:
-            print("Running the second part of the Greibach algorithm")
+        with tracer.phase("greibach second part"):
+            self.second_part_Greibach(verbose)
         
-        self.second_part_Greibach(verbose)
-    """ Recursive method that belongs whether a word can be generated by a grammar in Greibach normal form
+    """ It computes, for each variable, the minimum length of the words of terminal
+    symbols that can be derived from it. The variables that do not generate 
+    any word are not included. The lengths are decreased until no production
+    changes them. """
+    
+    def computeMinimumLengths(self):
+        minimum_lengths = {}
+        list_changed = True
+        
+        while list_changed:
+            list_changed = False
+            
+            if tracer.enabled:
+                tracer.count("minimum lengths iterations")
+            
+            for production_rule in self.production_rules:
+                length = 0
+                
+                for symbol in production_rule.right_part:
+                    if symbol in self.variable_symbols or symbol in self.production_rules.rules_by_left_part:
+                        if symbol not in minimum_lengths:
+                            length = None
+                            break
+                        
+                        length = length + minimum_lengths[symbol]
+                        
+                    else:
+                        length = length + 1
+                        
+                if length is not None and length < minimum_lengths.get(production_rule.left_part, length + 1):
+                    minimum_lengths[production_rule.left_part] = length
+                    list_changed = True
+                    
+        return minimum_lengths
+    
+    """ Method that checks whether a word can be generated by a grammar in Greibach normal form
     Remaining word is the part of the word that must be generated and current word is the word that has not 
-    been derived yet (the non-terminal symbols of the word derived)
+    been derived yet (the symbols of the word derived that are pending, given as a list or as a string)
+    Instead of exploring each derivation, it computes, for each position i of the word (from the last
+    one to the first one) and each variable A, the positions j such that A derives the subchain from i
+    to j. With A -> a B1...Bk and a in the position i, these positions are obtained from i+1 with the
+    positions already computed for B1, ..., Bk, so each variable is derived only once from each position,
+    whatever the pending symbols after it are. The positions from which the rest of the production 
+    needs more symbols than the remaining ones are discarded.
     """
 
     def checkBelongingRecursiveGreibach(self, remaining_word, current_word, verbose = False):
-        """Base case: If there is no more word to generate, the word belongs if, and only if,
-        there is no more part of the word to derive"""
+        length_word = len(remaining_word)
+        minimum_lengths = self.computeMinimumLengths()
         
-        if len(remaining_word) == 0:
+        def isVariable(symbol):
+            return symbol in self.variable_symbols or symbol in self.production_rules.rules_by_left_part
+        
+        """ end_positions[i][A] = positions j such that A derives the subchain from i to j. 
+        The variables that derive no subchain from i are not included """
+        
+        end_positions = [None] * (length_word + 1)
+        
+        """ It returns the positions reached after deriving the symbols from each one
+        of the positions given, discarding the positions from which the symbols need 
+        more symbols than the remaining ones """
+        
+        def derivePositions(symbols, positions):
+            minimum_length = 0
             
-            if verbose:
-                print("Remaining word to generate " + current_word)
+            for symbol in symbols:
+                minimum_length = minimum_length + minimum_lengths.get(symbol, 1) if isVariable(symbol) else minimum_length + 1
             
-            belongs = len(current_word) == 0
-            return belongs
-    
+            for symbol in symbols:
+                if isVariable(symbol):
+                    minimum_length = minimum_length - minimum_lengths.get(symbol, 0)
+                    next_positions = set()
+                    
+                    for position in positions:
+                        next_positions.update(end_positions[position].get(symbol, ()))
+                        
+                else:
+                    minimum_length = minimum_length - 1
+                    next_positions = {position + 1 for position in positions if position < length_word and remaining_word[position] == symbol}
+                    
+                positions = {position for position in next_positions if position + minimum_length <= length_word}
+                
+                if len(positions) == 0:
+                    break
+                
+            return positions
         
-        else:
+        for i in reversed(range(length_word + 1)):
+            end_positions[i] = {}
             
-            """ If there is more word to be generated, look for for each production rule such that the 
-                first symbol of the right part coincides with the first symbol of the word to generate and 
-                make a recursive call to the method with the remaining parts of the word to derive and the
-                word to be generated (removing the first symbol). 
-                If the word can be generated witn some of these rules, the method returns True. Otherwise,
-                the method returns false"""
+            # The null productions derive the empty subchain
+            for production_rule in self.production_rules.rulesStartingWith(None):
+                end_positions[i].setdefault(production_rule.left_part, set()).add(i)
             
+            """ For each production A -> a\alpha, where a is the symbol in the position i,
+            the positions reached by A are the positions reached by \alpha from i+1 """
             
-            for production_rule in self.production_rules:
-                
-                if production_rule.right_part[0] == remaining_word[0]:
-                    num_symbols_left_part = len(production_rule.left_part)
-                    i = 0
-                    discrepance = False
+            if i < length_word:
+                for production_rule in self.production_rules.rulesStartingWith(remaining_word[i]):
+                    positions = derivePositions(production_rule.right_part[1:], {i + 1})
                     
-                    while i < num_symbols_left_part and not discrepance:
-                        if not production_rule.left_part[i] == current_word[i]:
-                            discrepance = True
-                            
-                            
-                        else:
-                            i = i+1
-                            
-                    if not discrepance:
-                    
-                        word_derived = self.applyProductionRule(current_word, 0,num_symbols_left_part-1, production_rule)
-                        partial_belonging = self.checkBelongingRecursiveGreibach(remaining_word[1:],word_derived[1:])
-                    
-                        if partial_belonging:
-                            return True
-            
+                    if len(positions) > 0:
+                        end_positions[i].setdefault(production_rule.left_part, set()).update(positions)
+                        
+            if (verbose or tracer.enabled) and len(end_positions[i]) > 0:
+                trace(verbose, "greibach end positions", "Variables that derive a prefix of " + "".join(remaining_word[i:]) + " and the positions where it ends\n" + str(end_positions[i]),
+                      position = i, end_positions = end_positions[i])
+        
+        if isinstance(current_word, str):
+            if current_word in self.variable_symbols:
+                pending_symbols = [current_word]
+                
+            else:
+                pending_symbols = re.findall(r"<[^>]*>|.", current_word)
+                
+        else:
+            pending_symbols = list(current_word)
             
-            return False
+        """ The word belongs if, and only if, the pending symbols derive the whole word """
+        
+        belongs = length_word in derivePositions(pending_symbols, {0})
+        
+        return belongs
+
+    """ It checks whether a word belongs to the language of the grammar with
+    the grammar in Greibach normal form, which is obtained only once while
+    the grammar does not change. The grammar is not modified. The empty word
+    belongs if the start symbol is nullable. """
 
     def wordBelongsGreibach(self, word, verbose = False):
-        self.transformGreibach(verbose)
-        belongs = self.checkBelongingRecursiveGreibach(word, self.start_symbol, verbose)
+        if len(word) == 0:
+            return self.start_symbol in self.nullableVariables()
+
+        greibach_grammar = self.membershipGreibachGrammar(verbose)
+        belongs = greibach_grammar.checkBelongingRecursiveGreibach(word, greibach_grammar.start_symbol, verbose)
         return belongs
+
+    """ The grammar in Greibach normal form used to check whether the words
+    that are not empty belong to the language: the Greibach normal form of the
+    grammar if it satisfies the conditions of greibachAppliable and has no 
+    null productions, and otherwise the one of its Chomsky normal form, which
+    generates the same words except the empty word, since the null and 
+    unitary productions make the productions of the Greibach algorithm grow
+    without limit. It is kept until the grammar changes, so it must not be
+    modified. """
+
+    def membershipGreibachGrammar(self, verbose = False):
+        def greibachDirectly():
+            return self.greibachAppliable() and all(len(production_rule.right_part) > 0 for production_rule in self.production_rules)
+        
+        if self.derivedForm("greibach directly", greibachDirectly):
+            return self.normalForm("greibach", lambda grammar: grammar.transformGreibach(verbose))
+
+        def transformChomskyGreibach(grammar):
+            grammar.transformChomsky(verbose)
+            grammar.transformGreibach(verbose)
+
+        return self.normalForm("greibach of chomsky", transformChomskyGreibach)
+    
+    """ It checks whether each word of words belongs to the language of the grammar.
+    The grammar is prepared only once for the algorithm given by engine 
+    ("earley", "cyk" or "greibach") and the words are checked by workers 
+    processes (all the processors if workers is None), in lists of chunk_size 
+    words. It returns a generator of the results in the same order as the 
+    words. The grammar is not modified, not even with the engine "greibach" 
+    (module batch_membership). 
+    With share_prefixes = True (only for the engine "earley"), the words are
+    sorted and the sets of the Earley algorithm of each common prefix are 
+    computed only once, so the cost depends on the size of the prefix tree
+    of the words. In that case, all the words are read before checking them. """
+    
+    def checkBelongingBatch(self, words, engine = "earley", workers = None, chunk_size = 256, leo = False, share_prefixes = False):
+        from batch_membership import compileMembership, checkEachWord, checkWords, checkWordsSharingPrefixes # The pool of processes is only imported when used
+        
+        if share_prefixes:
+            if engine != "earley":
+                raise ValueError("The prefixes can only be shared with the engine earley")
+            
+            results = checkWordsSharingPrefixes(self.compiledEarleyGrammar(), words, leo, workers, chunk_size)
+            
+            return iter(results)
+        
+        membership = compileMembership(self, engine, leo)
+        
+        return checkWords(partial(checkEachWord, membership), words, workers, chunk_size)
     
     """Check whether two grammars have the same terminal symbols"""
     
@@ -1220,13 +1579,132 @@ class GenerativeGrammar:
         return clausure_grammar
     
         
+    """ Generator of the words of the language of the grammar with length
+    between min_length and max_length (without limit if max_length is None),
+    from the shortest ones to the longest ones, and the words of the same 
+    length in lexicographic order. The words are obtained from the grammar in
+    Chomsky normal form (module cnf_language) length by length, only when 
+    they are requested, so the language can be infinite. If it is finite, the
+    generator ends after the longest word. The words are not kept: only the
+    numbers of derivations of each variable and length are kept until the 
+    grammar changes, and the memory used for each length is polynomial in 
+    the length, whatever the number of words. """
+    
+    def enumerateWords(self, min_length = 0, max_length = None):
+        if min_length == 0 and (max_length is None or max_length >= 0) and self.start_symbol in self.nullableVariables():
+            yield "" # The null productions are removed in the Chomsky normal form
+            
+        cnf_language = self.cnfLanguage()
+        
+        if max_length is None:
+            max_length = cnf_language.maximumLength() # None if the language is infinite
+            
+        length = max(min_length, 1)
+        
+        while max_length is None or length <= max_length:
+            for word in cnf_language.generateWords(length):
+                yield "".join(word)
+                
+            length = length + 1
+            
+    """ It returns the number of derivation trees of the words of length n in 
+    the grammar in Chomsky normal form, computed for all the lengths up to n
+    with integers without limit, without obtaining the words, in polynomial 
+    time in n. The empty word is counted once if it belongs to the language.
+    If the grammar in Chomsky normal form is unambiguous, it is the number of
+    words of length n. The counts of the shorter lengths are kept, so the next
+    calls only compute the new lengths. """
+    
+    def countDerivations(self, n):
+        if n == 0:
+            return 1 if self.start_symbol in self.nullableVariables() else 0
+        
+        cnf_language = self.cnfLanguage()
+        
+        return cnf_language.countDerivations(cnf_language.start_symbol, n)
+    
+    """ It returns the number of different words of length n of the language.
+    A word with several derivation trees is counted once, so there is not a 
+    dynamic program over the lengths as in countDerivations, which counts 
+    the derivation trees in polynomial time and gives the same number when
+    the grammar in Chomsky normal form is unambiguous. The words are obtained
+    one by one as in enumerateWords and are not kept, so the memory used is 
+    polynomial in n, but the time is proportional to the number of words, 
+    which is exponential in n for most languages. """
+    
+    def countWords(self, n):
+        if n == 0:
+            return self.countDerivations(n)
+        
+        cnf_language = self.cnfLanguage()
+        
+        return sum(1 for word in cnf_language.generateWords(n))
+    
+    """ It returns a list of k words of length n of the language chosen 
+    uniformly and independently, with the generator of random numbers 
+    initialized with seed. The derivation trees of the grammar in Chomsky
+    normal form are chosen uniformly with the numbers of derivations of each
+    variable and length (see countDerivations), which are computed once in 
+    polynomial time and kept for the next calls, and then each tree costs 
+    time proportional to n. If the grammar is ambiguous, a word with d 
+    derivation trees would be chosen d times more often, so it is accepted
+    with probability 1/d and otherwise another tree is chosen, which makes 
+    the words uniform. The number d is computed with the CYK algorithm for 
+    each tree chosen, in time proportional to n^3, and the expected number 
+    of trees chosen per word is countDerivations(n) divided by countWords(n),
+    which grows exponentially with n for very ambiguous grammars. With 
+    unambiguous = True this check is skipped, so the words are only uniform
+    if the grammar in Chomsky normal form is unambiguous. It raises 
+    ValueError if there are no words of length n. """
+    
+    def sampleWords(self, n, k, seed = None, unambiguous = False):
+        import random # Only needed to sample words
+        
+        if self.countDerivations(n) == 0:
+            raise ValueError("The language has no words of length " + str(n))
+        
+        if n == 0:
+            return [""] * k
+        
+        cnf_language = self.cnfLanguage()
+        start_symbol = cnf_language.start_symbol
+        random_generator = random.Random(seed)
+        words = []
+        
+        while len(words) < k:
+            word = cnf_language.sampleWord(start_symbol, n, random_generator)
+            
+            if not unambiguous:
+                number_derivations = cnf_language.countWordDerivations(start_symbol, word)
+                
+                if number_derivations > 1 and random_generator.randrange(number_derivations) != 0:
+                    continue
+                
+            words.append("".join(word))
+            
+        return words
+    
+    """ The words of the grammar in Chomsky normal form without useless symbols
+    by length, kept until the grammar changes """
+            
+    def cnfLanguage(self):
+        from cnf_language import CNFLanguage
+        
+        def computeCNFLanguage():
+            cnf_grammar = self.chomskyForm()
+            cnf_grammar.deleteUselessSymbolsProductions()
+            
+            return CNFLanguage(cnf_grammar)
+        
+        return self.derivedForm("cnf language", computeCNFLanguage)
+    
     """ It checks whether the language generated by the grammar is empty
     It can be done by checking whether the initial symbols can be replaced 
     by terminal symbols (first part of the algorithm that deletes useless 
     symbols and productions. """
 
     def emptyLanguaje(self):
-        variables_replaced_by_terminals = self.determineVarablesReplacedbyTerminals()
+        variables_replaced_by_terminals = self.productiveVariables()
         empty_languaje = self.start_symbol not in variables_replaced_by_terminals
         
         return empty_languaje
@@ -1236,46 +1714,113 @@ class GenerativeGrammar:
     A directed graph is built, in which the nodes are the variables and 
     there is an arc A - > B if, and only if, there is a production of the 
     form A -> alphaBbeta.
-    The languaje in infinity if, and only if, this graph has some cycle
+    The languaje in infinity if, and only if, this graph has some cycle,
+    which is searched with findVariableCycle. With verbose = True, the
+    cycle found is printed. The grammar is not modified: the null and unitary
+    productions and then the useless symbols are deleted in a copy, and the 
+    cycle is kept until the grammar changes.
     """
     
-    def infinityLanguaje(self):
+    def infinityLanguaje(self, verbose = False):
         
-        """ Delete useless symbols and productions, 
-        as well as null and unitary productions"""
+        """ Delete null and unitary productions, and then the useless symbols
+        and productions, since the variables that only derive the empty word
+        become useless when the null productions are deleted """
         
-        self.deleteUselessSymbolsProductions()
-        self.deleteNullProductions()
-        self.deleteUnitaryProductions()
+        def findCycleReducedGrammar():
+            with tracer.phase("infinityLanguaje"):
+                reduced_grammar = self.copy()
+                reduced_grammar.deleteNullProductions()
+                reduced_grammar.deleteUnitaryProductions()
+                reduced_grammar.deleteUselessSymbolsProductions()
+            
+                return reduced_grammar.findVariableCycle()
         
-        graph = nx.DiGraph()
+        # The languaje in infinity if, and only if, there is at least one cycle
+        cycle = self.derivedForm("cycle", findCycleReducedGrammar)
+        infinity = cycle is not None
+        
+        if (verbose or tracer.enabled) and infinity:
+            trace(verbose, "variable cycle", "The languaje is infinity because of the cycle of variables \n" + " -> ".join(cycle + [cycle[0]]), cycle = cycle)
         
-        graph.add_nodes_from(self.variable_symbols) # copy the variables in the nodes
+        return infinity
+    
+    """ It computes the graph of the productions: for each variable A, the 
+    variables B such that there is a production A -> alphaBbeta """
+    
+    def computeDependencyGraph(self):
         
         """ For each production rule A->\alpha: 
             For each variable in \alpha B: If there is no an arc A->B,
             add the arc A -> B
         """
         
+        successors = {variable: {} for variable in self.variable_symbols} 
+        
         for production_rule in self.production_rules:
-            for symbol_right in production_rule.right_part:
-                if symbol_right in self.variable_symbols:
-                    graph.add_edge(production_rule.left_part, symbol_right)
-                    
-      
-        # The languaje in infinity if, and only if, there is at least one cycle
-        cycles = nx.recursive_simple_cycles(graph)
-        infinity = len(cycles) > 0
+            if production_rule.left_part in successors:
+                for symbol_right in production_rule.right_part:
+                    if symbol_right in successors:
+                        successors[production_rule.left_part][symbol_right] = None
+                        
+        return {variable: tuple(successors[variable]) for variable in successors}
+    
+    """ It returns the variables of a cycle A1 -> A2 -> ... -> Ak -> A1 of the 
+    graph of the productions (see computeDependencyGraph), or None if the 
+    graph has no cycles. 
+    The graph is explored in depth from each variable not explored yet, 
+    keeping the path from the variable where the exploration started. There
+    is a cycle if, and only if, an arc reaches a variable of the path. Each
+    variable and each arc are explored only once. """
+    
+    def findVariableCycle(self):
+        successors = self.dependencyGraph()
         
-        return infinity
+        NOT_EXPLORED, IN_PATH, EXPLORED = 0, 1, 2
+        state = dict.fromkeys(successors, NOT_EXPLORED)
+        
+        for first_variable in successors:
+            if state[first_variable] != NOT_EXPLORED:
+                continue
+            
+            # Path from first_variable, with the arcs of each variable not explored yet
+            path = [first_variable]
+            pending_arcs = [iter(successors[first_variable])]
+            state[first_variable] = IN_PATH
+            
+            while len(path) > 0:
+                next_variable = next(pending_arcs[-1], None)
+                
+                if next_variable is None: # All arcs of the last variable explored
+                    state[path.pop()] = EXPLORED
+                    pending_arcs.pop()
+                    
+                elif state[next_variable] == IN_PATH: # The arc closes a cycle
+                    return path[path.index(next_variable):]
+                
+                elif state[next_variable] == NOT_EXPLORED:
+                    state[next_variable] = IN_PATH
+                    path.append(next_variable)
+                    pending_arcs.append(iter(successors[next_variable]))
+                    
+        return None
     
     """It checks whether a word u belongs to the grammar
     via the CYK algorithm
     u_i,j = subchain that starts in the position i and has length j
     Determine Vij = variables that generate u_i,j
+    With engine = "numpy", the sets Vij are boolean vectors over the 
+    variables computed with NumPy (module cyk_bitset), which is much 
+    faster for long words.
     """
     
-    def checkBelongingCYK(self, word, verbose = False):
+    def checkBelongingCYK(self, word, verbose = False, engine = "python"):
+        if engine == "numpy":
+            return self.compiledCYKGrammar().belongs(word, verbose)
+        
+        elif engine != "python":
+            raise ValueError("Unknown CYK engine: " + str(engine))
+        
         variables_generate_subchain = []
         
         """ Determine V_i1 = {A | A->a is a production} and the i-th
@@ -1286,17 +1831,16 @@ class GenerativeGrammar:
         
         for i in range(len(word)):
             
-            if verbose:
-                print("Determining V_" + str(i) + "1")
+            if verbose or tracer.enabled:
+                trace(verbose, "cyk cell", "Determining V_" + str(i) + "1", start = i, length = 1)
             
             V_i1 = []
             
-            for production_rule in self.production_rules:
-                if production_rule.right_part[0] == word[i]:  # If there production is unitary and the i-th symbol in in the right
-                   V_i1.append(production_rule.left_part) 
-                   
-                   if verbose:
-                       print("Adding" + production_rule.left_part + "to V_" + str(i) + "1")
+            for production_rule in self.production_rules.rulesStartingWith(word[i]):  # If there production is unitary and the i-th symbol in in the right
+               V_i1.append(production_rule.left_part) 
+               
+               if verbose or tracer.enabled:
+                   trace(verbose, "cyk variable added", "Adding " + production_rule.left_part + " to V_" + str(i) + "1", variable = production_rule.left_part, start = i, length = 1)
             
         
             variables_generate_symbols.append(V_i1)
@@ -1312,8 +1856,8 @@ class GenerativeGrammar:
             for i in range(len(word) - j + 1): # Go across all possible start positions of the word, given the length
                 V_ij = []
                 
-                if verbose:
-                    print("Determining V_" + str(i) + str(j))
+                if verbose or tracer.enabled:
+                    trace(verbose, "cyk cell", "Determining V_" + str(i) + str(j), start = i, length = j)
                 
                 for k in range(j-1):
                     for production_rule in self.production_rules:
@@ -1324,8 +1868,8 @@ class GenerativeGrammar:
                                 if production_rule.left_part not in V_ij:
                                     V_ij.append(production_rule.left_part)
                                     
-                                    if verbose:
-                                        print("Adding " + production_rule.left_part + " to V_" + str(i) + str(j))
+                                    if verbose or tracer.enabled:
+                                        trace(verbose, "cyk variable added", "Adding " + production_rule.left_part + " to V_" + str(i) + str(j), variable = production_rule.left_part, start = i, length = j)
                                     
                                     
                 variables_generate_lengthj.append(V_ij)
@@ -1347,135 +1891,69 @@ class GenerativeGrammar:
     Aim: find the k such that \beta derives to u[j+1...k]. In such a case,
     A derives to u[i+1...k].
     For all j, REGISTERS[j] contains all registers of the form Registers (i,j,A,\alpha,\betha)
+    The registers are stored as items (production, position of the dot, i), 
+    and each set REGISTERS[j] indexes its registers by the symbol after the 
+    dot, so the termination step only visits the registers that wait for
+    the variable completed (module earley).
+    With leo = True, the chains of registers completed one after the other
+    are replaced by their topmost register (optimization of Joop Leo), so 
+    right recursive grammars are recognized in linear time.
     """
     
-    def checkBelongingEarly(self, word, verbose = False):
-        length_word = len(word)
-        """Step 1. Initiaization: REGISTERS [0] = {(0,0,S,\epsilon,\betha): S -> \betha is a production}
-        j = 0"""
-        
-        first_registers = []
-        
-        if verbose:
-            print("Determining REGISTERS [0] ")
-        
-        for production_rule in self.production_rules:
-            if production_rule.left_part == self.start_symbol:
-                register = (0,0,self.start_symbol, "", production_rule.right_part)
-                first_registers.append(register)
-                
-                if verbose:
-                    print("Adding ")
-                    print(register)
-                
-        total_registers = [first_registers]
-        j = 0
-        
-        while j < length_word:
-            """Step 2. Clausure: For all register (i,j,A,\alpha,\betha|gamma) in REGISTERS[j]:
-            For each production B -> deltha: create the register (j,j,B,\epsilon,\deltha)
-            e insert it in REGISTERS[j]. Repeat recursively for all registers inserted. """
-            
-            if verbose:
-                print("Clausure")
-            
-            for register in total_registers[j]:
-                for production_rule in self.production_rules:
-                    if len(register[4]) > 0:
-                        if production_rule.left_part == register[4][0]:
-                            new_register = (j,j,production_rule.left_part, "", production_rule.right_part)
-                       
-                            if new_register not in total_registers[j]:
-                                total_registers[j].append(new_register)
-                                
-                                if verbose:
-                                    print("Adding ")
-                                    print(new_register)
-             
-            """ Step 3. Advance: For all register (i,j,A,\alpha,c|gamma) in REGISTERS[j] 
-            where c is a terminal symbol that appears in the position j of u,
-            create the register (i,j+1,A,\alpha,c,\gamma) and insert it in REGISTERS[j+1]
-            j = j+1 """
-            
-            if verbose:
-                print("Advance")
-            
-            
-            next_registers = [] # REGISTERS[j+1]
-            
-            for register in total_registers[j]:
-                if len(register[4]) > 0:
-                    if register[4][0] == word[j]:
-                        new_register = (register[0], j+1, register[2], register[3] + word[j], register[4][1:])
-                        next_registers.append(new_register)
-                        
-                        if verbose:
-                            print("Adding ")
-                            print(new_register)
-
-            
-            total_registers.append(next_registers) # append REGISTERS[j+1]
-            j = j+1
-            
-            """Step 4. Termination: For each par of registers of the form (i,j,A,\alpha,\epsilon) in REGISTERS[j]
-            and (h,i,B,\gamma, A\delta) in REGISTERS[i], create the new register (h,j,B,\gammaA,\delta) 
-            and insert it into REGISTERS[j]"""
-            
-            if verbose:
-                print("Termination")
-            
-            for first_register in total_registers[j]: # register (i,j,A,\alpha, \epsilon)
-                if len(first_register[4]) == 0:
-                    for i in range(j):
-                        for second_register in total_registers[i]:
-                            if second_register[1] == first_register[0] and len(second_register[4]) > 0:
-                                if second_register[4][0] == first_register[2]: # register (h,i,B,\gamma,A\delta)
-                                    new_register = (second_register[0], j, second_register[2], second_register[3] + first_register[2], second_register[4][1:])
-                                    total_registers[j].append(new_register)
-                                    
-                                    if verbose:
-                                        print("Adding ")
-                                        print(new_register)
-                                    
-        """The word can be generated by the grammar if, and only if, in REGISTERS[n], there is a register of the form (0,n,S,\alpha, \epsilon)"""
+    def checkBelongingEarly(self, word, verbose = False, leo = False):
+        return recognizeWord(self.compiledEarleyGrammar(), word, verbose, leo)
     
-        register_found = False
-        i = 0
+    """ It returns an Earley recognizer of the grammar for a word whose symbols
+    are given one by one with feed(symbol), which only builds the set of the
+    new symbol, so the cost of each symbol does not depend on the symbols 
+    before it being given again. After each symbol, accepts() tells whether
+    the symbols given are a word of the language and isViablePrefix() 
+    whether they can be continued to one (feed also returns it). The grammar
+    is compiled without its useless symbols, since otherwise the registers of
+    the productions that cannot generate any word would keep the sets of
+    prefixes without continuation not empty. It uses the grammar compiled 
+    when it is created, so the grammar can change meanwhile. """
+    
+    def streamingRecognizer(self, verbose = False, leo = False):
+        def compileWithoutUselessSymbols():
+            return CompiledEarleyGrammar(self.normalForm("without useless symbols", lambda grammar: grammar.deleteUselessSymbolsProductions()))
         
-        while not register_found and i < len(total_registers[length_word]):
-            register = total_registers[length_word][i]
-            
-            if register[0] == 0 and register[2] == self.start_symbol and len(register[4]) == 0:
-                register_found = True
-                
-                if verbose:
-                    print("The word can be generated by the grammar because of the register ")
-                    print(register)
-                
-            else:
-                i = i+1
-            
+        compiled_grammar = self.derivedForm("earley without useless symbols", compileWithoutUselessSymbols)
         
-        return register_found
-    # Print the object printing each one of the elements of the grammar   
-
-
+        return EarleyRecognizer(compiled_grammar, verbose, leo)
     
-    def __str__(self):
-        print ("Variable symbols: ")
-        print(self.variable_symbols)
+    """ It returns the shared packed parse forest of the word (module sppf)
+    built from the sets of the Earley algorithm, with all its derivation 
+    trees in cubic space. Its root is None if the word is not generated. The
+    trees are obtained one by one with trees(), and countTrees() returns 
+    their number without obtaining them. """
+    
+    def parseForest(self, word, verbose = False):
+        from sppf import parseForest # Only needed to parse the words
         
-        print ("Start symbol: ")
-        print(self.start_symbol)
+        return parseForest(self.compiledEarleyGrammar(), word, verbose)
     
-        print ("Terminal symbols: ")
-        print(self.terminal_symbols)
+    """ The grammar compiled for the CYK algorithm with NumPy, kept until the grammar changes """
     
-        print ("Production Rules: ")
+    def compiledCYKGrammar(self):
+        from cyk_bitset import CompiledCYKGrammar # NumPy is only imported when this engine is used
         
-        for rule in self.production_rules:
-            print(rule)
+        return self.derivedForm("cyk numpy", lambda: CompiledCYKGrammar(self))
+    
+    """ The grammar compiled for the Earley algorithm, kept until the grammar changes """
+    
+    def compiledEarleyGrammar(self):
+        return self.derivedForm("earley", lambda: CompiledEarleyGrammar(self))
+    
+    # Text with each one of the elements of the grammar, one per line, without printing it
+
+    def __str__(self):
+        lines = ["Variable symbols: ", str(list(self.variable_symbols)),
+                 "Start symbol: ", str(self.start_symbol),
+                 "Terminal symbols: ", str(list(self.terminal_symbols)),
+                 "Production Rules: "]
+        lines.extend(str(rule) for rule in self.production_rules)
             
-        return ""
+        return "\n".join(lines)
     
     
@@ -0,0 +1,104 @@
+# -*- coding: utf-8 -*-
+"""
+Cache on disk of the normal forms of the grammars. The normal form of a
+grammar is stored in a file whose name is a fingerprint of the content of
+the grammar and the name of the transformation, so a process that reads a
+grammar already transformed by another process only has to read a file.
+"""
+
+import hashlib
+import os
+import pickle
+import tempfile
+
+from production_rule import ProductionRule
+
+
+""" Version of the transformations. It is part of the fingerprints, so it must
+be increased whenever a transformation changes the grammar that it obtains,
+and then the normal forms stored before are not used """
+
+TRANSFORMATIONS_VERSION = 3
+
+""" Environment variable with the directory of the cache used when no cache
+is given to readGrammar, transformChomsky or transformGreibach """
+
+CACHE_DIRECTORY_VARIABLE = "GRAMMAR_CACHE_DIRECTORY"
+
+
+""" It returns a fingerprint (SHA-256 in hexadecimal) of the content of the
+grammar: variables, terminal symbols, start symbol and productions, in the
+order they are stored, and of the name of the transformation """
+
+def grammarFingerprint(grammar, transformation):
+    content = (TRANSFORMATIONS_VERSION, transformation, list(grammar.variable_symbols), list(grammar.terminal_symbols),
+               grammar.start_symbol, [(rule.left_part, rule.right_part) for rule in grammar.production_rules])
+
+    return hashlib.sha256(repr(content).encode("utf-8")).hexdigest()
+
+
+""" Cache of normal forms in a directory. Each normal form is stored as the
+lists of symbols and the pairs (left part, right part) of the productions,
+serialized with pickle. The files are read with pickle, so the directory
+must only be writable by trusted users. """
+
+class GrammarCache:
+    directory: str # directory of the files of the normal forms
+
+    def __init__(self, directory):
+        self.directory = directory
+
+    """ The cache of the directory given by the environment variable, or None
+    if it is not defined """
+
+    @staticmethod
+    def fromEnvironment():
+        directory = os.environ.get(CACHE_DIRECTORY_VARIABLE)
+
+        if not directory:
+            return None
+
+        return GrammarCache(directory)
+
+    def pathNormalForm(self, fingerprint):
+        return os.path.join(self.directory, fingerprint + ".grammar")
+
+    """ It returns the tuple (variables, terminals, start symbol, productions) of
+    the normal form stored with the fingerprint, or None if it is not stored.
+    A file that cannot be read is considered as not stored """
+
+    def load(self, fingerprint):
+        path_file = self.pathNormalForm(fingerprint)
+
+        try:
+            with open(path_file, "rb") as file:
+                variables, terminals, start, rules = pickle.load(file)
+
+        except (OSError, EOFError, ValueError, TypeError, pickle.UnpicklingError):
+            return None
+
+        production_rules = [ProductionRule(left_part, right_part) for left_part, right_part in rules]
+
+        return variables, terminals, start, production_rules
+
+    """ It stores the normal form with the fingerprint of the grammar before the
+    transformation. The file is written with another name and then renamed, so
+    the processes that read it at the same time never find it incomplete """
+
+    def store(self, fingerprint, normal_form):
+        os.makedirs(self.directory, exist_ok = True)
+        path_file = self.pathNormalForm(fingerprint)
+        content = (list(normal_form.variable_symbols), list(normal_form.terminal_symbols), normal_form.start_symbol,
+                   [(rule.left_part, rule.right_part) for rule in normal_form.production_rules])
+
+        descriptor, temporary_path = tempfile.mkstemp(dir = self.directory, suffix = ".tmp")
+
+        try:
+            with os.fdopen(descriptor, "wb") as file:
+                pickle.dump(content, file, protocol = pickle.HIGHEST_PROTOCOL)
+
+            os.replace(temporary_path, path_file)
+
+        except BaseException:
+            os.remove(temporary_path)
+            raise
@@ -5,14 +5,49 @@ Created on Tue Nov  7 18:17:12 2023
 @author: Serafin
 """
 
+import itertools
+
+
+""" Production rule of a grammar. The rules are immutable: the right part
+is stored as a tuple and the attributes cannot be assigned after the 
+creation of the rule. Two rules are equal if they have the same left and 
+right parts, so the rules can be stored in sets and dictionaries. """
 
 class ProductionRule:
+    __slots__ = ("left_part", "right_part", "hash_value")
+    
     left_part: str # the left part of the production
-    right_part: [str]
+    right_part: tuple # the symbols of the right part
+    hash_value: int # computed only once, when the rule is created
     
     def __init__(self, left, right):
+        right = tuple(right)
         object.__setattr__(self, "left_part", left)
         object.__setattr__(self, "right_part", right)
+        object.__setattr__(self, "hash_value", hash((left, right)))
+        
+    def __setattr__(self, name, value):
+        raise AttributeError("The production rules cannot be modified")
+        
+    def __delattr__(self, name):
+        raise AttributeError("The production rules cannot be modified")
+        
+    def __eq__(self, other):
+        if not isinstance(other, ProductionRule):
+            return NotImplemented
+        
+        return self.hash_value == other.hash_value and self.left_part == other.left_part and self.right_part == other.right_part
+    
+    def __hash__(self):
+        return self.hash_value
+    
+    # The rule is rebuilt from its parts when it is copied or pickled
+    
+    def __reduce__(self):
+        return (ProductionRule, (self.left_part, self.right_part))
+    
+    def __repr__(self):
+        return "ProductionRule(" + repr(self.left_part) + ", " + repr(self.right_part) + ")"
     
     def getLeftPart(self):
         return self.left_part
@@ -20,13 +55,212 @@ class ProductionRule:
     def getRightPart(self):
         return self.right_part
     
+    # The rule as it is written in the files of grammars, without printing it
+    
     def __str__(self):
-        print("Left part: ")
-        print(self.left_part)
+        return self.left_part + " -> " + "".join(self.right_part)
+    
+    
+""" Numbers of modification. Each list of rules or symbols takes a new number
+whenever it changes, so the objects computed from the lists can be reused
+while the numbers of the lists are the same """
+
+modification_numbers = itertools.count(1)
+
+
+""" List of production rules that keeps two indexes updated: the rules
+grouped by their left part and the rules grouped by the first symbol of
+their right part (None for the null productions). It also counts the 
+rules, so that checking whether a rule is in the list does not go across
+the list. Every method that changes the list also updates the indexes
+and the number of modification (version). """
+
+class ProductionRuleList(list):
+    
+    def __init__(self, rules = ()):
+        list.__init__(self, rules)
+        self.rebuildIndexes()
+        
+    """ It computes again both indexes from the rules in the list """
+        
+    def rebuildIndexes(self):
+        self.version = next(modification_numbers)
+        self.rules_by_left_part = {}
+        self.rules_by_first_symbol = {}
+        self.rule_counts = {}
+        
+        for rule in self:
+            self.indexRule(rule)
+    
+    @staticmethod
+    def firstSymbol(rule):
+        if len(rule.right_part) > 0:
+            return rule.right_part[0]
+        
+        return None
+            
+    def countRule(self, rule):
+        self.version = next(modification_numbers)
+        self.rule_counts[rule] = self.rule_counts.get(rule, 0) + 1
+        
+    def uncountRule(self, rule):
+        self.version = next(modification_numbers)
+        
+        if self.rule_counts[rule] == 1:
+            del self.rule_counts[rule]
+            
+        else:
+            self.rule_counts[rule] = self.rule_counts[rule] - 1
+            
+    def indexRule(self, rule):
+        self.rules_by_left_part.setdefault(rule.left_part, []).append(rule)
+        self.rules_by_first_symbol.setdefault(ProductionRuleList.firstSymbol(rule), []).append(rule)
+        self.countRule(rule)
         
-        print("Right part: ")
-        print(self.right_part)
+    def unindexRule(self, rule):
+        self.uncountRule(rule)
         
-        return ""
+        for index, key in ((self.rules_by_left_part, rule.left_part), 
+                           (self.rules_by_first_symbol, ProductionRuleList.firstSymbol(rule))):
+            bucket = index[key]
+            
+            # Remove the rule itself (not an equal one) from the bucket
+            for i in range(len(bucket)):
+                if bucket[i] is rule:
+                    del bucket[i]
+                    break
+                
+            if len(bucket) == 0:
+                del index[key]
     
-    
\ No newline at end of file
+    def __contains__(self, rule):
+        return rule in self.rule_counts
+    
+    """ Queries. They return a new list, so the grammar can be modified
+    while going across the rules returned """
+    
+    def rulesWithLeftPart(self, variable):
+        return list(self.rules_by_left_part.get(variable, ()))
+    
+    def rulesStartingWith(self, symbol):
+        return list(self.rules_by_first_symbol.get(symbol, ()))
+    
+    def rulesWithLeftPartStartingWith(self, variable, symbol):
+        by_left_part = self.rules_by_left_part.get(variable, ())
+        by_first_symbol = self.rules_by_first_symbol.get(symbol, ())
+        
+        # Filter the smallest of both buckets
+        if len(by_left_part) <= len(by_first_symbol):
+            return [rule for rule in by_left_part if ProductionRuleList.firstSymbol(rule) == symbol]
+        
+        return [rule for rule in by_first_symbol if rule.left_part == variable]
+    
+    def leftParts(self):
+        return self.rules_by_left_part.keys()
+    
+    """ It removes several rules going across the list only once """
+    
+    def removeRules(self, rules_to_remove):
+        identifiers = {id(rule) for rule in rules_to_remove}
+        kept_rules = [rule for rule in self if id(rule) not in identifiers]
+        
+        list.__init__(self, kept_rules)
+        self.rebuildIndexes()
+    
+    # The indexes are built again when the list is copied or pickled
+    
+    def __reduce__(self):
+        return (ProductionRuleList, (list(self),))
+    
+    """ Methods of list that modify the list """
+    
+    def append(self, rule):
+        list.append(self, rule)
+        self.indexRule(rule)
+        
+    def extend(self, rules):
+        for rule in rules:
+            self.append(rule)
+            
+    def __iadd__(self, rules):
+        self.extend(rules)
+        return self
+            
+    def insert(self, position, rule):
+        list.insert(self, position, rule)
+        self.rebuildIndexes() # keep the order of the buckets as the order of the list
+        
+    def remove(self, rule):
+        position = list.index(self, rule)
+        del self[position]
+        
+    def pop(self, position = -1):
+        rule = list.pop(self, position)
+        self.unindexRule(rule)
+        return rule
+    
+    def clear(self):
+        list.clear(self)
+        self.rebuildIndexes()
+        
+    # The order of the buckets is the order of the list
+    
+    def sort(self, *, key = None, reverse = False):
+        try:
+            list.sort(self, key = key, reverse = reverse)
+            
+        finally:
+            self.rebuildIndexes() # The list can change even if a comparison fails
+        
+    def reverse(self):
+        list.reverse(self)
+        self.rebuildIndexes()
+        
+    def __imul__(self, times):
+        list.__imul__(self, times)
+        self.rebuildIndexes()
+        return self
+        
+    def __setitem__(self, position, value):
+        if isinstance(position, slice):
+            list.__setitem__(self, position, value)
+            self.rebuildIndexes()
+
+        else:
+            old_rule = self[position]
+            list.__setitem__(self, position, value)
+            
+            self.uncountRule(old_rule)
+            self.countRule(value)
+            
+            """ The new rule takes the place of the old one in the buckets
+            whose key does not change """
+            
+            for index, old_key, new_key in ((self.rules_by_left_part, old_rule.left_part, value.left_part), 
+                                            (self.rules_by_first_symbol, ProductionRuleList.firstSymbol(old_rule), ProductionRuleList.firstSymbol(value))):
+                old_bucket = index[old_key]
+                i = 0
+                
+                while old_bucket[i] is not old_rule:
+                    i = i+1
+                
+                if old_key == new_key:
+                    old_bucket[i] = value
+                    
+                else:
+                    del old_bucket[i]
+                    
+                    if len(old_bucket) == 0:
+                        del index[old_key]
+                        
+                    index.setdefault(new_key, []).append(value)
+
+    def __delitem__(self, position):
+        if isinstance(position, slice):
+            list.__delitem__(self, position)
+            self.rebuildIndexes()
+            
+        else:
+            rule = self[position]
+            list.__delitem__(self, position)
+            self.unindexRule(rule)
@@ -0,0 +1,283 @@
+# -*- coding: utf-8 -*-
+"""
+Shared packed parse forest (SPPF) of a word obtained from the sets of the
+Earley algorithm. It represents all the derivation trees of the word with a
+number of nodes and families that is cubic in the length of the word, even
+when the number of trees is exponential.
+"""
+
+import math
+
+from earley import EarleyRecognizer
+
+
+""" Forest of the derivation trees of a word. There are two kinds of nodes:
+- Symbol node (A, i, j): the variable A derives the symbols i..j-1 of the word.
+- Intermediate node (rule, dot, i, j): the first dot symbols of the right
+  part of the production rule derive the symbols i..j-1 of the word.
+The families (packed nodes) of a symbol node (A, i, j) are the intermediate
+nodes (rule, len(right part), i, j) of the productions of A, and the families
+of an intermediate node (rule, dot, i, j) are the pairs formed by the
+intermediate node (rule, dot-1, i, k) and the node of the last symbol, which is
+the symbol node (X, k, j) if it is a variable X or the terminal symbol. Every
+node is built from an item of the Earley sets, so it has at least one tree.
+Only the nodes reachable from the root are built. """
+
+class SharedPackedForest:
+    root: tuple # symbol node (S, 0, n), or None if the word is not generated
+    families: dict # node -> list of families, each one a tuple of nodes and terminal symbols
+
+    def __init__(self, compiled_grammar, recognizer):
+        self.grammar = compiled_grammar
+        self.sets = recognizer.sets
+        self.completed_origins = {} # position j -> (variable -> origins of its completed items in REGISTERS[j])
+        self.families = {}
+        self.root = None
+        n = len(self.sets) - 1
+
+        if recognizer.accepts():
+            self.root = (compiled_grammar.start_symbol, 0, n)
+            self.buildNodes()
+
+        del self.sets, self.completed_origins # Only needed to build the nodes
+
+    """ Origins i of the completed items (rule, len(right part), i) of each
+    variable in REGISTERS[position], computed only once per set """
+
+    def completedOrigins(self, position):
+        origins = self.completed_origins.get(position)
+
+        if origins is None:
+            origins = {}
+            grammar = self.grammar
+
+            for rule, dot, origin in self.sets[position].items:
+                if dot == len(grammar.right_parts[rule]) and rule != grammar.start_rule:
+                    origins.setdefault(grammar.left_parts[rule], set()).add(origin)
+
+            self.completed_origins[position] = origins
+
+        return origins
+
+    """ It builds the families of the nodes reachable from the root, from the
+    last symbol of the productions to the first one, with a worklist """
+
+    def buildNodes(self):
+        grammar = self.grammar
+        pending = [self.root]
+
+        while len(pending) > 0:
+            node = pending.pop()
+
+            if node in self.families:
+                continue
+
+            if len(node) == 3: # Symbol node
+                variable, i, j = node
+                completed_rules = {} # right part -> rule, so the repeated productions are considered once
+
+                for rule in grammar.rules_by_left_part.get(variable, ()):
+                    right_part = grammar.right_parts[rule]
+
+                    if (rule, len(right_part), i) in self.sets[j].item_set:
+                        completed_rules.setdefault(right_part, rule)
+
+                node_families = [((rule, len(right_part), i, j),) for right_part, rule in completed_rules.items()]
+
+            else: # Intermediate node
+                rule, dot, i, j = node
+                node_families = []
+
+                if dot > 0:
+                    symbol = grammar.right_parts[rule][dot - 1]
+                    previous_item = (rule, dot - 1, i)
+
+                    if symbol not in grammar.variables:
+                        # The item of REGISTERS[j] was obtained advancing with the symbol j-1
+                        node_families.append(((rule, dot - 1, i, j - 1), symbol))
+
+                    else:
+                        for k in sorted(self.completedOrigins(j).get(symbol, ())):
+                            if previous_item in self.sets[k].item_set:
+                                node_families.append(((rule, dot - 1, i, k), (symbol, k, j)))
+
+                else:
+                    node_families.append(()) # The empty prefix derives the empty word
+
+            self.families[node] = node_families
+
+            for family in node_families:
+                for child in family:
+                    if isinstance(child, tuple) and child not in self.families:
+                        pending.append(child)
+
+    def numberNodes(self):
+        return len(self.families)
+
+    def numberFamilies(self):
+        return sum(len(node_families) for node_families in self.families.values())
+
+    """ It returns the number of derivation trees of the word, with integers
+    without limit, computed once per node in an order where the children of
+    a node are before it. If there is a cycle reachable from the root (for
+    instance with a production A->A), there are infinitely many trees and it
+    returns math.inf """
+
+    def countTrees(self):
+        if self.root is None:
+            return 0
+
+        counts = {}
+        in_progress = set()
+        stack = [self.root]
+
+        while len(stack) > 0:
+            node = stack[-1]
+
+            if node in counts:
+                stack.pop()
+                continue
+
+            children = [child for family in self.families[node] for child in family
+                        if isinstance(child, tuple) and child not in counts]
+
+            if node not in in_progress:
+                in_progress.add(node)
+
+                for child in children:
+                    if child in in_progress:
+                        return math.inf
+
+                stack.extend(children)
+                continue
+
+            stack.pop()
+            in_progress.discard(node)
+            total = 0
+
+            for family in self.families[node]:
+                product = 1
+
+                for child in family:
+                    if isinstance(child, tuple):
+                        product = product * counts[child]
+
+                total = total + product
+
+            counts[node] = total
+
+        return counts[self.root]
+
+    """ Generator of the derivation trees of the word, obtained one by one
+    from the forest only when they are requested. A tree is a pair
+    (variable, children), where children is a tuple of trees and terminal
+    symbols, and the empty word has no children. If the forest has cycles,
+    only the trees where no symbol node appears inside itself are generated,
+    which are finitely many.
+    The trees are built without recursion, with a list of the tasks still to
+    do and a list of the parts of the tree already built, both linked lists 
+    (first element, rest of the list) so they are shared by the choices. A 
+    task is one of:
+    - ("node", node, ancestors): choose a family of the node and build it.
+    - ("tree", variable): replace the children on top of the parts by a tree.
+    - ("child", None): add the tree on top of the parts to the children below.
+    - ("child", symbol): add the terminal symbol to the children on top.
+    Each node whose families are not all tried yet is kept in a stack of 
+    choices with the tasks and the parts of the moment it was chosen, so 
+    when a tree is finished, or there is no family without cycles, the next
+    family of the last choice is tried. """
+
+    def trees(self):
+        if self.root is None:
+            return
+
+        choices = [] # [node, ancestors, next family, tasks, parts]
+        state = ((("node", self.root, frozenset()), None), None) # (tasks, parts)
+
+        while state is not None:
+            tasks, parts = state
+
+            if tasks is None:
+                yield parts[0]
+                state = self.nextFamily(choices)
+                continue
+
+            task, tasks = tasks
+
+            if task[0] == "node":
+                choices.append([task[1], task[2], 0, tasks, parts])
+                state = self.nextFamily(choices)
+
+            elif task[0] == "tree":
+                children, parts = parts
+                state = (tasks, ((task[1], children), parts))
+
+            elif task[1] is None:
+                last_tree, (children, parts) = parts
+                state = (tasks, (children + (last_tree,), parts))
+
+            else:
+                children, parts = parts
+                state = (tasks, (children + (task[1],), parts))
+
+    """ It tries the next family of the last choice, going back to the previous
+    choices when there are no more families, and returns the tasks and the 
+    parts of the tree with that family, or None if all the choices are tried.
+    The families whose last child is a symbol node that contains them are 
+    skipped, as in the cycles of the forest """
+
+    def nextFamily(self, choices):
+        while len(choices) > 0:
+            choice = choices[-1]
+            node, ancestors, position, tasks, parts = choice
+            node_families = self.families[node]
+
+            while position < len(node_families):
+                family = node_families[position]
+                position = position + 1
+
+                if len(node) == 3: # Symbol node
+                    intermediate_node, = family
+                    tasks = (("node", intermediate_node, ancestors | {node}), (("tree", node[0]), tasks))
+
+                elif len(family) == 0:
+                    parts = ((), parts)
+
+                else:
+                    previous_node, last_child = family
+
+                    if last_child in ancestors:
+                        continue
+
+                    if isinstance(last_child, tuple):
+                        tasks = (("node", last_child, ancestors), (("child", None), tasks))
+
+                    else:
+                        tasks = (("child", last_child), tasks)
+
+                    tasks = (("node", previous_node, ancestors), tasks)
+
+                if position < len(node_families):
+                    choice[2] = position
+
+                else:
+                    choices.pop()
+
+                return tasks, parts
+
+            choices.pop()
+
+        return None
+
+
+""" It builds the shared packed parse forest of the word with the compiled
+grammar. Leo's optimization is not used, since it skips the items of the
+intermediate registers that are needed to build the forest. """
+
+def parseForest(compiled_grammar, word, verbose = False):
+    recognizer = EarleyRecognizer(compiled_grammar, verbose)
+
+    for symbol in word:
+        recognizer.feed(symbol)
+
+    return SharedPackedForest(compiled_grammar, recognizer)
@@ -5,7 +5,23 @@ Created on Wed Nov  8 11:55:44 2023
 @author: Serafin
 """
 
-from grammar import GenerativeGrammar
+import collections
+import io
+import itertools
+import os
+import pickle
+import random
+import subprocess
+import sys
+import tempfile
+import tracemalloc
+
+import grammar_cache
+
+from grammar import GenerativeGrammar, GrammarSyntaxError
+from grammar_cache import GrammarCache, grammarFingerprint
+from production_rule import ProductionRule, ProductionRuleList
+from tracing import tracer
 
 path = "grammar_proof.txt"
 generated_grammar = GenerativeGrammar.readGrammar(path)
@@ -73,4 +89,654 @@ word = 'baa'
 belongs = generated_grammar.checkBelongingEarly(word)
 print(belongs)
 
- 
\ No newline at end of file
+ 
+
+""" Modules imported by grammar.py and time of the import, checked in new 
+processes: it must not import heavy modules such as networkx or numpy, which
+are only imported when the methods that need them are used. The time is the
+best of several imports, so that a slow run does not make the test fail, and
+the budget is several times the time measured (about 0.04 s) """
+
+IMPORT_TIME_BUDGET = 0.5 # seconds
+NUM_IMPORTS = 5
+
+code_import = ("import sys, time; start_time = time.perf_counter(); import grammar; "
+               "print(time.perf_counter() - start_time); "
+               "print([module for module in ('networkx', 'numpy') if module in sys.modules])")
+import_times = []
+
+for i in range(NUM_IMPORTS):
+    output_import = subprocess.run([sys.executable, "-c", code_import], capture_output = True, text = True, check = True).stdout.split("\n")
+    import_times.append(float(output_import[0]))
+    
+    assert output_import[1] == "[]", "grammar.py imports " + output_import[1]
+    
+assert min(import_times) < IMPORT_TIME_BUDGET, "importing grammar.py takes " + str(min(import_times)) + " s"
+
+
+""" Random grammars with null and unitary productions. The algorithms are
+compared with the words of each length obtained directly from the 
+productions, adding to the words of each variable the words of its 
+productions until no word is added """
+
+def randomGrammar(seed, num_variables = 3, terminals = ("a", "b"), max_length_right_part = 3):
+    random_generator = random.Random(seed)
+    variables = ["S"] + ["<X" + str(i) + ">" for i in range(1, num_variables)]
+    production_rules = []
+    
+    for variable in variables:
+        for k in range(random_generator.randint(1, 3)):
+            right_part = [random_generator.choice(variables + list(terminals)) for i in range(random_generator.randint(0, max_length_right_part))]
+            production_rules.append(ProductionRule(variable, right_part))
+            
+    return GenerativeGrammar(variables, list(terminals), "S", production_rules)
+
+def wordsUpToLength(grammar, max_length):
+    words = {variable: set() for variable in grammar.variable_symbols}
+    words_added = True
+    
+    while words_added:
+        words_added = False
+        
+        for production_rule in grammar.production_rules:
+            rule_words = {""}
+            
+            for symbol in production_rule.right_part:
+                symbol_words = words[symbol] if symbol in words else {symbol}
+                rule_words = {u + v for u in rule_words for v in symbol_words if len(u) + len(v) <= max_length}
+                
+            if not rule_words <= words[production_rule.left_part]:
+                words[production_rule.left_part] |= rule_words
+                words_added = True
+                
+    return sorted(words[grammar.start_symbol], key = lambda word: (len(word), word))
+
+""" Lengths of the words of the language up to the length given, obtained 
+in the same way as the words. The lengths of each variable are the bits of
+an integer, so the lengths of a symbol are added to the lengths of the 
+previous symbols of a production by shifting the bits """
+
+def wordLengthsUpTo(grammar, max_length):
+    all_lengths = (1 << (max_length + 1)) - 1
+    lengths = {variable: 0 for variable in grammar.variable_symbols}
+    lengths_added = True
+    
+    while lengths_added:
+        lengths_added = False
+        
+        for production_rule in grammar.production_rules:
+            rule_lengths = 1 # only the length 0
+            
+            for symbol in production_rule.right_part:
+                symbol_lengths = lengths[symbol] if symbol in lengths else 2 # only the length 1
+                new_lengths = 0
+                
+                for length in range(max_length + 1):
+                    if symbol_lengths >> length & 1:
+                        new_lengths |= rule_lengths << length
+                        
+                rule_lengths = new_lengths & all_lengths
+                
+            if rule_lengths | lengths[production_rule.left_part] != lengths[production_rule.left_part]:
+                lengths[production_rule.left_part] |= rule_lengths
+                lengths_added = True
+                
+    return [length for length in range(max_length + 1) if lengths[grammar.start_symbol] >> length & 1]
+
+NUM_RANDOM_GRAMMARS = 800
+MAX_LENGTH = 4
+
+""" The derivation trees of the words of a finite language do not repeat a 
+variable in a path, so with 3 variables and at most 3 symbols in the right
+parts the words of a finite language have at most 27 symbols. An infinite 
+language has words longer than that, and some of them shorter than 4 times
+that length """
+
+MAX_FINITE_LENGTH = 27
+
+""" enumerateWords gives the words of each length in lexicographic order,
+and if the language is finite, the generator without maximum length ends
+after the longest word """
+
+for seed in range(NUM_RANDOM_GRAMMARS):
+    random_grammar = randomGrammar(seed)
+    words = list(random_grammar.enumerateWords(0, MAX_LENGTH))
+    assert words == wordsUpToLength(random_grammar, MAX_LENGTH), "enumerateWords, seed " + str(seed)
+    
+    for n in range(MAX_LENGTH + 1):
+        num_words = sum(1 for word in words if len(word) == n)
+        assert random_grammar.countWords(n) == num_words, "countWords, seed " + str(seed)
+        assert random_grammar.countDerivations(n) >= num_words, "countDerivations, seed " + str(seed)
+    
+    longest_length = max(wordLengthsUpTo(random_grammar, 4 * MAX_FINITE_LENGTH), default = 0)
+    infinite_language = longest_length > MAX_FINITE_LENGTH
+    assert random_grammar.infinityLanguaje() == infinite_language, "infinityLanguaje, seed " + str(seed)
+    
+    if not infinite_language:
+        assert list(random_grammar.enumerateWords()) == wordsUpToLength(random_grammar, longest_length), "enumerateWords of a finite language, seed " + str(seed)
+
+""" The words of a length are obtained one by one without keeping them: the
+first words of length 200 of S -> aS | bS | a | b, which has 2^200 words,
+take little memory """
+
+all_words_grammar = GenerativeGrammar(["S"], ["a", "b"], "S", [ProductionRule("S", ["a", "S"]), ProductionRule("S", ["b", "S"]),
+                                                              ProductionRule("S", ["a"]), ProductionRule("S", ["b"])])
+tracemalloc.start()
+first_words = list(itertools.islice(all_words_grammar.enumerateWords(200, 200), 5))
+peak_memory = tracemalloc.get_traced_memory()[1]
+tracemalloc.stop()
+
+assert first_words == ["a" * 200, "a" * 199 + "b", "a" * 198 + "ba", "a" * 198 + "bb", "a" * 197 + "baa"]
+assert peak_memory < 4 * 1024 * 1024, "enumerateWords uses " + str(peak_memory) + " bytes"
+
+
+""" Numbers of derivations: S -> aS | b has one derivation tree for each 
+word, and the words a^n of S -> SS | a have Catalan(n-1) derivation trees """
+
+right_recursive_grammar = GenerativeGrammar(["S"], ["a", "b"], "S", [ProductionRule("S", ["a", "S"]), ProductionRule("S", ["b"])])
+ambiguous_grammar = GenerativeGrammar(["S"], ["a"], "S", [ProductionRule("S", ["S", "S"]), ProductionRule("S", ["a"])])
+catalan_numbers = [1]
+
+for n in range(1, 200):
+    catalan_numbers.append(catalan_numbers[-1] * 2 * (2 * n - 1) // (n + 1))
+    
+for n in range(1, 200):
+    assert right_recursive_grammar.countDerivations(n) == 1
+    assert ambiguous_grammar.countDerivations(n) == catalan_numbers[n - 1]
+    
+assert [right_recursive_grammar.countWords(n) for n in range(40)] == [0] + [1] * 39
+assert [ambiguous_grammar.countWords(n) for n in range(40)] == [0] + [1] * 39
+
+
+""" The words sampled have the length given and belong to the language, 
+also rejecting the trees of the ambiguous grammars """
+
+for seed in range(100):
+    random_grammar = randomGrammar(seed)
+    words = wordsUpToLength(random_grammar, MAX_LENGTH)
+    
+    for n in range(MAX_LENGTH + 1):
+        words_of_length = [word for word in words if len(word) == n]
+        
+        if len(words_of_length) > 0:
+            sampled_words = random_grammar.sampleWords(n, 10, seed) + random_grammar.sampleWords(n, 10, seed, unambiguous = True)
+            assert set(sampled_words) <= set(words_of_length), "sampleWords, seed " + str(seed)
+            
+assert right_recursive_grammar.sampleWords(600, 3, 0) == ["a" * 599 + "b"] * 3
+
+""" In S -> aX | Xa, X -> a | b, the word aa has 2 derivation trees, and the
+words aa, ab and ba are sampled with the same frequency (chi-square test 
+with 2 degrees of freedom and significance 0.001) """
+
+two_trees_grammar = GenerativeGrammar(["S", "X"], ["a", "b"], "S", [ProductionRule("S", ["a", "X"]), ProductionRule("S", ["X", "a"]),
+                                                                   ProductionRule("X", ["a"]), ProductionRule("X", ["b"])])
+num_samples = 3000
+sampled_words = two_trees_grammar.sampleWords(2, num_samples, 0)
+chi_square = sum((sampled_words.count(word) - num_samples / 3) ** 2 / (num_samples / 3) for word in ["aa", "ab", "ba"])
+
+assert set(sampled_words) == {"aa", "ab", "ba"}
+assert chi_square < 13.82, "sampleWords is not uniform: chi-square " + str(chi_square)
+
+
+""" Derivation trees of the parse forests: the trees of the words of each 
+length of the grammar in Chomsky normal form are its derivations, and the 
+trees of a long word of a right recursive grammar are built without 
+recursion """
+
+for n in range(1, 10):
+    ambiguous_forest = ambiguous_grammar.parseForest("a" * n)
+    assert ambiguous_forest.countTrees() == catalan_numbers[n - 1]
+    assert len(set(ambiguous_forest.trees())) == catalan_numbers[n - 1]
+    
+long_word_forest = right_recursive_grammar.parseForest("a" * 600 + "b")
+assert len(list(long_word_forest.trees())) == 1 and long_word_forest.countTrees() == 1
+
+for seed in range(100):
+    chomsky_grammar = randomGrammar(seed).chomskyForm()
+    words = wordsUpToLength(chomsky_grammar, MAX_LENGTH)
+    
+    for n in range(1, MAX_LENGTH + 1):
+        forests = [chomsky_grammar.parseForest(word) for word in words if len(word) == n]
+        
+        for forest in forests:
+            assert len(set(forest.trees())) == forest.countTrees(), "trees, seed " + str(seed)
+            
+        assert sum(forest.countTrees() for forest in forests) == chomsky_grammar.countDerivations(n), "countTrees, seed " + str(seed)
+
+
+""" Membership algorithms: the Earley algorithm (with and without Leo's 
+optimization), the CYK algorithm (in Python and with NumPy) on the Chomsky
+normal form, the Greibach normal form and the batch engines agree with the
+words of the language on all the words up to MAX_LENGTH symbols. The 
+Greibach normal form can have exponentially many productions, so it is 
+checked on grammars with 2 variables and on the grammars of the files """
+
+all_words = ["".join(word) for n in range(MAX_LENGTH + 1) for word in itertools.product("ab", repeat = n)]
+
+def checkMembership(grammar, words, language_words, greibach = True):
+    language_words = set(language_words)
+    chomsky_grammar = grammar.chomskyForm()
+    
+    for engine in ["earley", "cyk"] + (["greibach"] if greibach else []):
+        assert list(grammar.checkBelongingBatch(words, engine, workers = 1)) == [word in language_words for word in words], "checkBelongingBatch " + engine
+        
+    for word in words:
+        belongs = word in language_words
+        assert grammar.checkBelongingEarly(word) == belongs, "checkBelongingEarly " + word
+        assert grammar.checkBelongingEarly(word, leo = True) == belongs, "checkBelongingEarly leo " + word
+        
+        if len(word) > 0:
+            assert chomsky_grammar.checkBelongingCYK(word) == belongs, "checkBelongingCYK " + word
+            assert chomsky_grammar.checkBelongingCYK(word, engine = "numpy") == belongs, "checkBelongingCYK numpy " + word
+            
+        if greibach:
+            assert grammar.wordBelongsGreibach(word) == belongs, "wordBelongsGreibach " + word
+            
+for seed in range(200):
+    random_grammar = randomGrammar(seed)
+    checkMembership(random_grammar, all_words, wordsUpToLength(random_grammar, MAX_LENGTH), greibach = False)
+    
+for seed in range(100):
+    random_grammar = randomGrammar(seed, num_variables = 2)
+    checkMembership(random_grammar, all_words, wordsUpToLength(random_grammar, MAX_LENGTH))
+    
+for path in ["grammar_proof.txt", "grammar_null_productions.txt", "grammar_belonging.txt", "grammar_unitary_productions.txt"]:
+    file_grammar = GenerativeGrammar.readGrammar(path)
+    file_words = ["".join(word) for n in range(MAX_LENGTH + 1) for word in itertools.product(file_grammar.terminal_symbols, repeat = n)]
+    checkMembership(file_grammar, file_words, wordsUpToLength(file_grammar, MAX_LENGTH))
+
+
+""" The indexes of the list of production rules are the ones of a new list 
+with the same rules after each method that modifies the list, and the
+version changes """
+
+def sameIndexes(production_rules):
+    new_production_rules = ProductionRuleList(list(production_rules))
+    
+    def bucketCounts(index):
+        return {key: collections.Counter(bucket) for key, bucket in index.items()}
+    
+    return (bucketCounts(production_rules.rules_by_left_part) == bucketCounts(new_production_rules.rules_by_left_part) and
+            bucketCounts(production_rules.rules_by_first_symbol) == bucketCounts(new_production_rules.rules_by_first_symbol) and
+            production_rules.rule_counts == new_production_rules.rule_counts)
+
+index_rules = [ProductionRule("S", ["a", "S"]), ProductionRule("S", []), ProductionRule("A", ["S", "b"]), ProductionRule("A", ["a"])]
+new_rule = ProductionRule("B", ["b", "A"])
+
+modifications = {
+    "append": lambda rules: rules.append(new_rule),
+    "extend": lambda rules: rules.extend([new_rule, new_rule]),
+    "+=": lambda rules: rules.__iadd__([new_rule]),
+    "insert": lambda rules: rules.insert(1, new_rule),
+    "remove": lambda rules: rules.remove(index_rules[2]),
+    "pop": lambda rules: rules.pop(0),
+    "clear": lambda rules: rules.clear(),
+    "setitem": lambda rules: rules.__setitem__(1, new_rule),
+    "setitem slice": lambda rules: rules.__setitem__(slice(1, 3), [new_rule]),
+    "delitem": lambda rules: rules.__delitem__(3),
+    "delitem slice": lambda rules: rules.__delitem__(slice(0, 2)),
+    "sort": lambda rules: rules.sort(key = str),
+    "reverse": lambda rules: rules.reverse(),
+    "*=": lambda rules: rules.__imul__(3),
+    "removeRules": lambda rules: rules.removeRules([rules[0], rules[3]]),
+}
+
+for name, modify in modifications.items():
+    production_rules = ProductionRuleList(index_rules)
+    version = production_rules.version
+    modify(production_rules)
+    
+    assert sameIndexes(production_rules), "indexes after " + name
+    assert production_rules.version != version, "version after " + name
+    
+assert len(ProductionRuleList(index_rules).__imul__(3)) == 12
+
+""" The Greibach algorithm accepts the grammars it accepted before the 
+indexes, although they do not satisfy greibachAppliable """
+
+proof_grammar = GenerativeGrammar.readGrammar("grammar_proof.txt")
+assert not proof_grammar.greibachAppliable()
+assert len(GenerativeGrammar.readGrammar("grammar_proof.txt", "greibach").production_rules) > 0
+
+
+""" Streaming recognizer: the symbols are given one by one, and after each 
+one it tells whether they are a word of the language and whether they are 
+a prefix of some word. The prefixes of S -> aSb | ab are the words a^i b^j 
+with j <= i, and the words of random grammars up to MAX_LENGTH symbols are
+checked with their prefixes """
+
+anbn_grammar = GenerativeGrammar(["S"], ["a", "b"], "S", [ProductionRule("S", ["a", "S", "b"]), ProductionRule("S", ["a", "b"])])
+
+def isPrefixAnBn(prefix):
+    num_a = len(prefix) - len(prefix.lstrip("a"))
+    
+    return len(prefix) - num_a <= num_a and prefix[num_a:] == "b" * (len(prefix) - num_a)
+
+for leo in (False, True):
+    for word in ["".join(word) for n in range(1, 9) for word in itertools.product("ab", repeat = n)]:
+        recognizer = anbn_grammar.streamingRecognizer(leo = leo)
+        
+        for position, symbol in enumerate(word):
+            prefix = word[:position + 1]
+            viable_prefix = recognizer.feed(symbol)
+            
+            assert viable_prefix == recognizer.isViablePrefix() == isPrefixAnBn(prefix), "isViablePrefix " + prefix
+            assert recognizer.accepts() == (isPrefixAnBn(prefix) and prefix.count("a") == prefix.count("b")), "accepts " + prefix
+            
+for seed in range(100):
+    random_grammar = randomGrammar(seed)
+    language_words = wordsUpToLength(random_grammar, MAX_LENGTH + 2)
+    
+    for word in all_words:
+        recognizer = random_grammar.streamingRecognizer()
+        assert recognizer.accepts() == ("" in language_words)
+        
+        for position, symbol in enumerate(word):
+            prefix = word[:position + 1]
+            viable_prefix = recognizer.feed(symbol)
+            
+            assert recognizer.accepts() == (prefix in language_words), "accepts, seed " + str(seed)
+            assert viable_prefix or not any(language_word.startswith(prefix) for language_word in language_words), "isViablePrefix, seed " + str(seed)
+
+""" backtrack goes back to a shorter prefix, and the next symbols are given
+after it """
+
+recognizer = anbn_grammar.streamingRecognizer()
+
+for symbol in "aab":
+    recognizer.feed(symbol)
+    
+assert recognizer.isViablePrefix() and not recognizer.accepts()
+
+recognizer.backtrack(1) # a
+assert recognizer.feed("b") and recognizer.accepts()
+
+recognizer.backtrack(0)
+assert not recognizer.feed("b") and not recognizer.accepts()
+
+recognizer.backtrack(0)
+
+for symbol in "aaabbb":
+    recognizer.feed(symbol)
+    
+assert recognizer.accepts()
+
+""" The cache on disk: a normal form is stored the first time and read back
+later without transforming, a change of TRANSFORMATIONS_VERSION invalidates
+it, and a corrupt or truncated file is ignored and written again """
+
+def grammarContent(grammar):
+    return (list(grammar.variable_symbols), list(grammar.terminal_symbols), grammar.start_symbol,
+            [(rule.left_part, rule.right_part) for rule in grammar.production_rules])
+
+def transformChomskyCounting(grammar, cache, num_transformations):
+    def transform(verbose):
+        num_transformations.append(1)
+        grammar.computeChomsky(verbose)
+        
+    grammar.applyTransformation("chomsky", transform, cache = cache)
+    
+path_null_productions = "grammar_null_productions.txt"
+chomsky_content = grammarContent(GenerativeGrammar.readGrammar(path_null_productions).chomskyForm())
+
+with tempfile.TemporaryDirectory() as cache_directory:
+    cache = GrammarCache(cache_directory)
+    num_transformations = []
+    
+    for _ in range(2):
+        cached_grammar = GenerativeGrammar.readGrammar(path_null_productions)
+        transformChomskyCounting(cached_grammar, cache, num_transformations)
+        assert grammarContent(cached_grammar) == chomsky_content
+        
+    assert len(num_transformations) == 1, "normal form not read from the cache"
+    assert grammarContent(GenerativeGrammar.readGrammar(path_null_productions, "chomsky", cache = cache)) == chomsky_content
+    
+    cache_files = [name for name in os.listdir(cache_directory) if name.endswith(".grammar")]
+    assert len(cache_files) == 1 and not any(name.endswith(".tmp") for name in os.listdir(cache_directory))
+    
+    transformations_version = grammar_cache.TRANSFORMATIONS_VERSION
+    
+    try:
+        grammar_cache.TRANSFORMATIONS_VERSION = transformations_version + 1
+        cached_grammar = GenerativeGrammar.readGrammar(path_null_productions)
+        transformChomskyCounting(cached_grammar, cache, num_transformations)
+        
+    finally:
+        grammar_cache.TRANSFORMATIONS_VERSION = transformations_version
+        
+    assert len(num_transformations) == 2, "normal form of another version read from the cache"
+    assert grammarContent(cached_grammar) == chomsky_content
+    
+    path_cache_file = cache.pathNormalForm(grammarFingerprint(GenerativeGrammar.readGrammar(path_null_productions), "chomsky"))
+    
+    with open(path_cache_file, "rb") as file:
+        cache_file_content = file.read()
+    
+    for damaged_content in (cache_file_content[:len(cache_file_content) // 2], b"", b"not a normal form", pickle.dumps(3)):
+        with open(path_cache_file, "wb") as file:
+            file.write(damaged_content)
+            
+        assert cache.load(grammarFingerprint(GenerativeGrammar.readGrammar(path_null_productions), "chomsky")) is None
+        
+        cached_grammar = GenerativeGrammar.readGrammar(path_null_productions)
+        transformChomskyCounting(cached_grammar, cache, num_transformations)
+        assert grammarContent(cached_grammar) == chomsky_content
+        
+        with open(path_cache_file, "rb") as file:
+            assert file.read() == cache_file_content, "damaged file not written again"
+        
+    assert len(num_transformations) == 6
+
+""" fromText reports the line and the column (from 1) of the malformed
+input. The blank lines count as lines """
+
+def syntaxErrorPosition(lines):
+    try:
+        GenerativeGrammar.fromText(lines)
+        
+    except GrammarSyntaxError as error:
+        assert isinstance(error, ValueError)
+        assert str(error).startswith("Line " + str(error.line) + ", column " + str(error.column) + ": ")
+        return error.line, error.column
+    
+    return None
+
+assert syntaxErrorPosition(["V = {S,B}\n", "T = {a,b}\n", "S -> aB|a<B|b\n"]) == (3, 10)
+assert syntaxErrorPosition(["V = {S,<B>}\n", "T = {a,b}\n", "\n", "S -> a<B>\n", "<B> -> b|<B\n"]) == (5, 10)
+assert syntaxErrorPosition(["V = {S}\n", "T = {a}\n", "S => a\n"]) == (3, 1)
+assert syntaxErrorPosition(["V = {S}\n", "T = {a}\n", " -> a\n"]) == (3, 1)
+assert syntaxErrorPosition(["T = {a}\n", "\n", "S -> a\n"]) == (3, 1)
+assert syntaxErrorPosition(["V = {S,<B>}\n", "T = {a,b}\n", "S -> a<B>|<B>b\n"]) is None
+
+""" Each right part is stripped on its own, so the blanks around '|' are not
+symbols, while the blanks inside a right part are """
+
+spaced_grammar = GenerativeGrammar.fromText(["V = { S , <B> }\r\n", "T = {a,b}\r\n", "S ->  a<B> | b |\r\n", "<B> -> a b\r\n"])
+
+assert list(spaced_grammar.variable_symbols) == ["S", "<B>"] and list(spaced_grammar.terminal_symbols) == ["a", "b"]
+assert [(rule.left_part, tuple(rule.right_part)) for rule in spaced_grammar.production_rules] == [("S", ("a", "<B>")), ("S", ("b",)), ("S", ()), ("<B>", ("a", " ", "b"))]
+
+""" The tracer counts the events and gives them to the hooks while it is
+enabled, measures the time of the phases, and records nothing while it is
+disabled """
+
+traced_events = []
+
+def recordEvent(name, fields):
+    traced_events.append((name, fields))
+    
+def eventCounts(names):
+    return collections.Counter(name for name, fields in traced_events if name in names)
+
+tracer.reset()
+tracer.startCounting()
+tracer.addHook(recordEvent)
+
+try:
+    assert tracer.enabled
+    traced_grammar = GenerativeGrammar.readGrammar("grammar_null_productions.txt")
+    traced_grammar.transformChomsky()
+    
+    transform_snapshot = tracer.snapshot()
+    
+    assert all("message" in fields for name, fields in traced_events)
+    assert transform_snapshot["counters"]["transform chomsky calls"] == 1
+    assert transform_snapshot["counters"]["deleteNullProductions calls"] == 1 and transform_snapshot["counters"]["deleteUnitaryProductions calls"] == 1
+    assert set(transform_snapshot["phase_seconds"]) == {"transform chomsky", "deleteNullProductions", "deleteUnitaryProductions"}
+    assert all(seconds > 0 for seconds in transform_snapshot["phase_seconds"].values())
+    assert transform_snapshot["phase_seconds"]["transform chomsky"] >= transform_snapshot["phase_seconds"]["deleteNullProductions"] + transform_snapshot["phase_seconds"]["deleteUnitaryProductions"]
+    
+    event_counts = eventCounts({name for name, fields in traced_events})
+    assert all(transform_snapshot["counters"][name] == count for name, count in event_counts.items())
+    assert event_counts["nullable variables"] == 1 and event_counts["chomsky normal form size"] == 1
+    assert event_counts["production added"] > 0 and event_counts["production removed"] > 0
+    
+    size_fields = [fields for name, fields in traced_events if name == "chomsky normal form size"][0]
+    assert all(size_fields[key] == value for key, value in traced_grammar.computeSize().items())
+    
+    tracer.reset()
+    traced_events.clear()
+    
+    assert GenerativeGrammar.readGrammar("grammar_null_productions.txt").checkBelongingEarly("abb")
+    
+    earley_counts = eventCounts({"earley set", "earley item", "earley accepted"})
+    assert [fields["position"] for name, fields in traced_events if name == "earley set"] == [0, 1, 2, 3]
+    assert earley_counts["earley accepted"] == 1 and earley_counts["earley item"] > 0
+    assert all(tracer.counters[name] == count for name, count in earley_counts.items())
+    
+    traced_events.clear()
+    assert not GenerativeGrammar.readGrammar("grammar_null_productions.txt").checkBelongingEarly("baaba")
+    assert eventCounts({"earley accepted"})["earley accepted"] == 0
+    
+finally:
+    tracer.removeHook(recordEvent)
+    tracer.stopCounting()
+    
+tracer.reset()
+traced_events.clear()
+
+assert not tracer.enabled
+traced_grammar = GenerativeGrammar.readGrammar("grammar_null_productions.txt")
+traced_grammar.transformChomsky()
+assert traced_grammar.checkBelongingEarly("ab")
+assert tracer.snapshot() == {"counters": {}, "phase_seconds": {}} and traced_events == []
+
+""" A grammar written with writeGrammar, in a file or in a file object, is
+read back by readGrammar with the same symbols and the same productions of
+each variable, in the same order """
+
+def rulesByVariable(grammar):
+    return [(variable, [tuple(rule.right_part) for rule in grammar.production_rules if rule.left_part == variable]) for variable in grammar.variable_symbols]
+
+def checkWrittenGrammar(grammar):
+    with tempfile.TemporaryDirectory() as directory:
+        path_written = os.path.join(directory, "grammar_written.txt")
+        grammar.writeGrammar(path_written)
+        read_grammar = GenerativeGrammar.readGrammar(path_written)
+        
+    assert list(read_grammar.variable_symbols) == list(grammar.variable_symbols)
+    assert list(read_grammar.terminal_symbols) == list(grammar.terminal_symbols)
+    assert read_grammar.start_symbol == grammar.start_symbol
+    assert rulesByVariable(read_grammar) == rulesByVariable(grammar)
+    assert len(read_grammar.production_rules) == len(grammar.production_rules)
+    
+    written_text = io.StringIO()
+    grammar.writeGrammar(written_text)
+    rewritten_text = io.StringIO()
+    GenerativeGrammar.fromText(written_text.getvalue().splitlines(True)).writeGrammar(rewritten_text)
+    assert written_text.getvalue() == rewritten_text.getvalue()
+    
+for path_written in ["grammar_proof.txt", "grammar_null_productions.txt", "grammar_belonging.txt", "grammar_unitary_productions.txt", "grammar_Chomsky.txt", "grammar_Greibach.txt", "grammar_useless.txt"]:
+    checkWrittenGrammar(GenerativeGrammar.readGrammar(path_written))
+    checkWrittenGrammar(GenerativeGrammar.readGrammar(path_written).chomskyForm())
+    
+for seed in range(100):
+    checkWrittenGrammar(randomGrammar(seed))
+
+""" deleteNullProductions with binarize = True obtains the same language as
+without it, and a production with m nullable symbols gives a number of
+productions linear in m: S -> X1...X20 with Xi -> xi | (null) gives the 
+productions Xi -> xi and 3 productions for each of the 19 binary productions
+of S and the new variables """
+
+for seed in range(300):
+    random_grammar = randomGrammar(seed, max_length_right_part = 5)
+    language_words = [word for word in wordsUpToLength(random_grammar, MAX_LENGTH) if word != ""]
+    
+    default_grammar = random_grammar.copy()
+    default_grammar.deleteNullProductions()
+    binarized_grammar = random_grammar.copy()
+    binarized_grammar.deleteNullProductions(binarize = True)
+    
+    assert not any(len(rule.right_part) == 0 for rule in binarized_grammar.production_rules), "null production, seed " + str(seed)
+    assert wordsUpToLength(default_grammar, MAX_LENGTH) == language_words, "deleteNullProductions, seed " + str(seed)
+    assert wordsUpToLength(binarized_grammar, MAX_LENGTH) == language_words, "deleteNullProductions binarize, seed " + str(seed)
+    
+nullable_variables = ["<X" + str(i) + ">" for i in range(1, 21)]
+nullable_terminals = ["x" + str(i) for i in range(1, 21)]
+nullable_rules = [ProductionRule("S", nullable_variables)]
+
+for variable, terminal in zip(nullable_variables, nullable_terminals):
+    nullable_rules.extend([ProductionRule(variable, [terminal]), ProductionRule(variable, [])])
+    
+nullable_grammar = GenerativeGrammar(["S"] + nullable_variables, nullable_terminals, "S", nullable_rules)
+nullable_grammar.deleteNullProductions(binarize = True)
+
+assert len(nullable_grammar.production_rules) == 77
+assert all(0 < len(rule.right_part) <= 2 for rule in nullable_grammar.production_rules)
+assert len(nullable_grammar.variable_symbols) == 21 + 18
+
+""" checkBelongingBatch with a pool of processes gives the results of 
+checkBelongingEarly in the same order as the words, also when the words 
+are given by a generator and there are more lists of words than processes """
+
+batch_words = ["".join(word) for n in range(8) for word in itertools.product("ab", repeat = n)]
+random.Random(0).shuffle(batch_words)
+
+batch_grammars = [GenerativeGrammar.readGrammar(path_batch) for path_batch in ["grammar_proof.txt", "grammar_null_productions.txt", "grammar_belonging.txt"]]
+batch_grammars.extend(randomGrammar(seed, num_variables = 2) for seed in range(3))
+
+for batch_grammar in batch_grammars:
+    expected_results = [batch_grammar.checkBelongingEarly(word) for word in batch_words]
+    
+    for engine in ["earley", "cyk", "greibach"]:
+        assert list(batch_grammar.checkBelongingBatch(batch_words, engine, workers = 2, chunk_size = 16)) == expected_results, "checkBelongingBatch workers " + engine
+        
+    assert list(batch_grammar.checkBelongingBatch(iter(batch_words), workers = 3, chunk_size = 7, leo = True)) == expected_results, "checkBelongingBatch workers leo"
+
+""" With share_prefixes = True the words are sorted to share the sets of 
+their common prefixes, and the results are given in the order of the words,
+with repeated words and in one or several processes """
+
+shared_words = batch_words + batch_words[:100]
+
+for batch_grammar in batch_grammars:
+    expected_results = [batch_grammar.checkBelongingEarly(word) for word in shared_words]
+    
+    for workers, leo in [(1, False), (1, True), (2, False), (3, True)]:
+        assert list(batch_grammar.checkBelongingBatch(iter(shared_words), workers = workers, chunk_size = 16, leo = leo, share_prefixes = True)) == expected_results, "checkBelongingBatch share_prefixes, workers " + str(workers)
+        
+try:
+    batch_grammars[0].checkBelongingBatch(batch_words, "cyk", share_prefixes = True)
+    assert False, "share_prefixes with the engine cyk"
+    
+except ValueError:
+    pass
+
+""" The variables of the suffixes of a long production are added with memory
+linear in its length, and another production with the same suffix shares 
+them """
+
+long_right_part = ["S", "<X1>"] * 2500
+long_grammar = GenerativeGrammar(["S", "<X1>"], ["a", "b"], "S", [ProductionRule("S", long_right_part), ProductionRule("S", ["<X1>"] + long_right_part[1:]),
+                                                                 ProductionRule("S", ["b"]), ProductionRule("<X1>", ["a"])])
+
+tracemalloc.start()
+long_grammar.transformChomsky()
+chomsky_peak_memory = tracemalloc.get_traced_memory()[1]
+tracemalloc.stop()
+
+assert chomsky_peak_memory < 16 * 2 ** 20, "transformChomsky of a production with " + str(len(long_right_part)) + " symbols uses " + str(chomsky_peak_memory) + " bytes"
+assert len(long_grammar.variable_symbols) == 2 + len(long_right_part) - 2
+assert len(long_grammar.production_rules) == 4 + len(long_right_part) - 2
+assert all(len(rule.right_part) == 2 for rule in long_grammar.production_rules if rule.left_part == "S" and rule.right_part != ("b",))
@@ -0,0 +1,127 @@
+# -*- coding: utf-8 -*-
+"""
+Events and counters of the algorithms. The algorithms report what they do
+(productions added or removed, registers of the Earley algorithm, sets of
+the CYK algorithm, iterations of the fixed point computations, ...) to the
+tracer of this module, and the time of their phases. Nothing is computed
+while the tracer is disabled: the algorithms check tracer.enabled before
+building an event, so the cost is one attribute lookup.
+"""
+
+import time
+from contextlib import nullcontext
+
+
+NO_PHASE = nullcontext() # returned by phase while the tracer is disabled
+
+
+""" Phase of an algorithm whose time is added to the tracer when it ends """
+
+class Phase:
+    __slots__ = ("tracer", "name", "start_time")
+
+    def __init__(self, tracer, name):
+        self.tracer = tracer
+        self.name = name
+
+    def __enter__(self):
+        self.start_time = time.perf_counter()
+        return self
+
+    def __exit__(self, exception_type, exception, traceback):
+        elapsed_time = time.perf_counter() - self.start_time
+        self.tracer.phase_seconds[self.name] = self.tracer.phase_seconds.get(self.name, 0.0) + elapsed_time
+        self.tracer.count(self.name + " calls")
+
+        return False
+
+
+""" Tracer of the algorithms. It is enabled while it counts (startCounting)
+or it has hooks. Each event is counted with its name and given to the hooks
+as hook(name, fields), where fields is a dictionary (the key "message" has
+the text printed by the algorithms with verbose = True). The counters and
+the times of the phases are obtained with snapshot, which returns a
+dictionary that can be written in JSON. """
+
+class Tracer:
+    enabled: bool # whether the algorithms report the events
+    counting: bool
+    hooks: list # functions hook(name, fields) called for each event
+    counters: dict # name -> number
+    phase_seconds: dict # name of the phase -> seconds spent in it
+
+    def __init__(self):
+        self.counting = False
+        self.hooks = []
+        self.counters = {}
+        self.phase_seconds = {}
+        self.updateEnabled()
+
+    def updateEnabled(self):
+        self.enabled = self.counting or len(self.hooks) > 0
+
+    def startCounting(self):
+        self.counting = True
+        self.updateEnabled()
+
+    def stopCounting(self):
+        self.counting = False
+        self.updateEnabled()
+
+    def addHook(self, hook):
+        self.hooks.append(hook)
+        self.updateEnabled()
+
+    def removeHook(self, hook):
+        self.hooks.remove(hook)
+        self.updateEnabled()
+
+    def reset(self):
+        self.counters = {}
+        self.phase_seconds = {}
+
+    def count(self, name, amount = 1):
+        self.counters[name] = self.counters.get(name, 0) + amount
+
+    def event(self, name, **fields):
+        self.count(name)
+
+        for hook in self.hooks:
+            hook(name, fields)
+
+    """ It returns the context manager that measures the time of the phase,
+    which does nothing while the tracer is disabled:
+        with tracer.phase("transformChomsky"):
+            ... """
+
+    def phase(self, name):
+        if not self.enabled:
+            return NO_PHASE
+
+        return Phase(self, name)
+
+    def snapshot(self):
+        return {"counters": dict(self.counters), "phase_seconds": dict(self.phase_seconds)}
+
+
+""" Tracer used by all the algorithms """
+
+tracer = Tracer()
+
+
+""" It reports an event: its message is printed if verbose is True, and it
+is given to the tracer if it is enabled. The callers check verbose or
+tracer.enabled before, so the message is only built when it is used """
+
+def trace(verbose, name, message, **fields):
+    if verbose:
+        print(message)
+
+    if tracer.enabled:
+        tracer.event(name, message = message, **fields)
+
+
+""" Hook that prints the events, as the algorithms do with verbose = True """
+
+def printEvent(name, fields):
+    print(fields.get("message", name))